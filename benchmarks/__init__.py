@@ -0,0 +1,11 @@
+"""
+Benchmarks run through the Django test runner against a throwaway test
+database. They are not picked up by the default test pattern; run them with
+
+    python manage.py test benchmarks --pattern="bench_*.py"
+
+bench_load compares against benchmarks/baseline.json; after a change that
+is meant to move its numbers, refresh the baseline with
+BENCH_UPDATE_BASELINE=1. Larger datasets for manual load tests come from
+the seed_social_graph command.
+"""
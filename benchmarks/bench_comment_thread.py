@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from drf_api.pagination import KeysetPagination
+from posts.models import Post
+from .bench_pagination import timed_get
+
+
+class CommentThreadBenchmark(APITestCase):
+    """
+    Compares first and deep page latency of CommentList?post= and the
+    /posts/<id>/comments/ thread on a post with many comments.
+    """
+    comment_counts = [1000, 10000, 20000]
+
+    def seed(self, post, users, total):
+        existing = Comment.objects.filter(post=post).count()
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    owner=users[i % len(users)], post=post,
+                    content=f'comment {i}',
+                )
+                for i in range(existing, total)
+            ),
+            batch_size=1000,
+        )
+
+    def test_deep_page_latency(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(50)
+        ]
+        post = Post.objects.create(owner=users[0], title='a busy post')
+        # A second post's comments, so the filter on post has to work
+        other = Post.objects.create(owner=users[0], title='another post')
+        self.seed(other, users, 1000)
+        self.client.force_authenticate(users[0])
+        keyset = KeysetPagination()
+        print()
+        print(f"{'comments':>8} {'endpoint':>20} {'page 1 ms':>10} "
+              f"{'deep ms':>9} {'queries':>8}")
+        for total in self.comment_counts:
+            self.seed(post, users, total)
+            deep = total - keyset.page_size * 2
+            last_page = deep // keyset.page_size
+            before = Comment.objects.filter(post=post).order_by(
+                *keyset.ordering
+            )[deep - 1]
+            cursor = keyset.encode_cursor(before)
+
+            thread = f'/posts/{post.id}/comments/'
+            endpoints = {
+                '/comments/?post=': (
+                    f'/comments/?post={post.id}',
+                    f'/comments/?post={post.id}&page={last_page}',
+                ),
+                'thread': (thread, f'{thread}?cursor={cursor}'),
+                'thread humanized': (
+                    f'{thread}?humanize=true',
+                    f'{thread}?humanize=true&cursor={cursor}',
+                ),
+            }
+            for name, (first_url, deep_url) in endpoints.items():
+                first_ms, _ = timed_get(self.client, first_url)
+                deep_ms, queries = timed_get(self.client, deep_url)
+                print(f'{total:>8} {name:>20} {first_ms:>10.2f} '
+                      f'{deep_ms:>9.2f} {queries:>8}')
@@ -0,0 +1,45 @@
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from posts.models import Post
+
+
+class ExportBenchmark(APITestCase):
+    """
+    Time and peak Python memory of streaming /export/ as the number of
+    exported rows grows. The peak should stay flat.
+    """
+    row_counts = [1000, 10000, 50000]
+
+    def stream(self):
+        # Reads the export a block at a time, as a client would
+        response = self.client.get('/export/')
+        return sum(len(block) for block in response.streaming_content)
+
+    def test_memory_stays_flat(self):
+        owner = User.objects.create_user(username='adam', password='pass')
+        post = Post.objects.create(owner=owner, title='a post')
+        self.client.force_authenticate(owner)
+        print()
+        print(f"{'rows':>7} {'ms':>9} {'MB':>9} {'peak KB':>8}")
+        for total in self.row_counts:
+            existing = Comment.objects.count()
+            Comment.objects.bulk_create(
+                (
+                    Comment(owner=owner, post=post, content='a comment ' * 10)
+                    for i in range(existing, total)
+                ),
+                batch_size=1000,
+            )
+            # Timed without tracemalloc, which slows allocation down
+            start = time.perf_counter()
+            size = self.stream()
+            elapsed = (time.perf_counter() - start) * 1000
+            tracemalloc.start()
+            self.stream()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{total:>7} {elapsed:>9.1f} {size / 2 ** 20:>9.2f} '
+                  f'{peak / 1024:>8.0f}')
@@ -0,0 +1,204 @@
+import os
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from drf_api.cache import CACHE_ALIAS
+from drf_api.pagination import KeysetPagination
+from drf_api.seeding import WORDS, seed_social_graph
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Categories, Post
+from .harness import (
+    Session, compare, load_baseline, replay, save_baseline, summarize,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def list_posts(session):
+    session.request('/posts/', session.user(), 'GET', '/posts/')
+
+
+def list_posts_logged_out(session):
+    session.request('/posts/ logged out', None, 'GET', '/posts/')
+
+
+def deep_posts_page(session):
+    post = Post.objects.only('created_at').get(pk=session.post_id())
+    cursor = KeysetPagination().encode_cursor(post)
+    session.request(
+        '/posts/?cursor=', session.user(), 'GET', f'/posts/?cursor={cursor}'
+    )
+
+
+def followed_posts(session):
+    user = session.user()
+    session.request(
+        '/posts/?owner__followed__owner__profile=', user, 'GET',
+        f'/posts/?owner__followed__owner__profile={user.profile.pk}',
+    )
+
+
+def search_posts(session):
+    word = session.rng.choice(WORDS)
+    session.request(
+        '/posts/?search=', session.user(), 'GET', f'/posts/?search={word}'
+    )
+
+
+def category(session):
+    name = session.rng.choice(Categories.values)
+    session.request(
+        '/category/<category>/', session.user(), 'GET', f'/category/{name}/'
+    )
+
+
+def feed(session):
+    session.request('/feed/', session.user(), 'GET', '/feed/')
+
+
+def list_profiles(session):
+    session.request('/profiles/', session.user(), 'GET', '/profiles/')
+
+
+def profile_detail(session):
+    profile = session.user().profile.pk
+    session.request(
+        '/profiles/<id>/', session.user(), 'GET', f'/profiles/{profile}/'
+    )
+
+
+def post_detail(session):
+    session.request(
+        '/posts/<id>/', session.user(), 'GET', f'/posts/{session.post_id()}/'
+    )
+
+
+def post_page(session):
+    session.request(
+        '/posts/<id>/page/', session.user(), 'GET',
+        f'/posts/{session.post_id()}/page/',
+    )
+
+
+def post_page_logged_out(session):
+    session.request(
+        '/posts/<id>/page/ logged out', None, 'GET',
+        f'/posts/{session.post_id()}/page/',
+    )
+
+
+def comment_thread(session):
+    session.request(
+        '/posts/<id>/comments/', session.user(), 'GET',
+        f'/posts/{session.post_id()}/comments/',
+    )
+
+
+def create_post(session):
+    session.request('/posts/', session.user(), 'POST', '/posts/', {
+        'title': 'load test', 'content': ' '.join(session.rng.choices(WORDS, k=40)),
+    })
+
+
+def comment(session):
+    session.request('/comments/', session.user(), 'POST', '/comments/', {
+        'post': session.post_id(), 'content': 'load test comment',
+    })
+
+
+def toggle_like(session):
+    user, post = session.user(), session.post_id()
+    like = Like.objects.filter(owner=user, post=post).first()
+    if like:
+        session.request('/likes/<id>/', user, 'DELETE', f'/likes/{like.pk}/')
+    else:
+        session.request('/likes/', user, 'POST', '/likes/', {'post': post})
+
+
+def toggle_follow(session):
+    user, other = session.user(), session.user()
+    if user == other:
+        return
+    follow = Follower.objects.filter(owner=user, followed=other).first()
+    if follow:
+        session.request(
+            '/followers/<id>/', user, 'DELETE', f'/followers/{follow.pk}/'
+        )
+    else:
+        session.request(
+            '/followers/', user, 'POST', '/followers/', {'followed': other.pk}
+        )
+
+
+READ_MIX = [
+    (20, list_posts),
+    (10, list_posts_logged_out),
+    (5, deep_posts_page),
+    (10, followed_posts),
+    (3, search_posts),
+    (4, category),
+    (15, feed),
+    (6, list_profiles),
+    (5, profile_detail),
+    (6, post_detail),
+    (6, post_page),
+    (4, post_page_logged_out),
+    (6, comment_thread),
+]
+WRITE_MIX = [
+    (2, create_post),
+    (5, toggle_like),
+    (3, comment),
+    (2, toggle_follow),
+]
+
+
+@override_settings(RESPONSE_CACHE=True)
+class LoadBenchmark(APITestCase):
+    """
+    Replays a read mix, a write mix and then the read mix again over a
+    seeded power-law social graph and compares each operation's p50/p95
+    latency and query counts against benchmarks/baseline.json, with
+    logged out responses cached as they are behind a shared cache. More
+    queries than in the baseline fail the benchmark; slower latency only
+    fails it past BENCH_LATENCY_TOLERANCE, e.g. 1.5, if set. Run with
+    BENCH_UPDATE_BASELINE=1 to store the new numbers as the baseline.
+    """
+    scale = {
+        'users': 300, 'follows': 20, 'posts': 5, 'likes': 10, 'comments': 3,
+    }
+    read_requests = 600
+    write_requests = 200
+
+    def test_read_and_write_mixes(self):
+        seed_social_graph(**self.scale)
+        caches[CACHE_ALIAS].clear()
+        session = Session(self.client)
+        replay(session, READ_MIX, self.read_requests)
+        replay(session, WRITE_MIX, self.write_requests)
+        replay(session, READ_MIX, self.read_requests)
+        summary = summarize(session.samples)
+
+        baseline = load_baseline(BASELINE_PATH)
+        if baseline and baseline['scale'] != self.scale:
+            print(f'The baseline is for {baseline["scale"]}, not comparing')
+            baseline = None
+        tolerance = os.environ.get('BENCH_LATENCY_TOLERANCE')
+        regressions = compare(
+            summary, baseline and baseline['operations'],
+            float(tolerance) if tolerance else None,
+        )
+        print(
+            f'{Comment.objects.count()} comments, {Post.objects.count()} '
+            f'posts, {Like.objects.count()} likes, '
+            f'{Follower.objects.count()} follows'
+        )
+        if baseline is None or os.environ.get('BENCH_UPDATE_BASELINE'):
+            save_baseline(
+                BASELINE_PATH, {'scale': self.scale, 'operations': summary}
+            )
+            print(f'Saved the baseline to {BASELINE_PATH}')
+            return
+        self.assertEqual(regressions, [])
@@ -0,0 +1,70 @@
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from drf_api.pagination import KeysetPagination
+from posts.models import Post
+
+
+def timed_get(client, url, runs=5):
+    # Median latency in milliseconds and the query count of one request
+    timings = []
+    for _ in range(runs):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return statistics.median(timings), len(context.captured_queries)
+
+
+class PaginationBenchmark(APITestCase):
+    """
+    Compares first and deep page latency of page number and keyset
+    pagination on /posts/ as the post table grows.
+    """
+    table_sizes = [1000, 10000, 50000]
+
+    def seed(self, owner, total):
+        existing = Post.objects.count()
+        Post.objects.bulk_create(
+            Post(owner=owner, title=f'post {i}')
+            for i in range(existing, total)
+        )
+
+    def test_deep_page_latency(self):
+        owner = User.objects.create_user(username='adam', password='pass')
+        # Logged in, so repeat requests aren't served by the response cache
+        self.client.force_authenticate(owner)
+        keyset = KeysetPagination()
+        print()
+        print(f"{'posts':>7} {'mode':>18} {'page 1 ms':>10} "
+              f"{'deep ms':>9} {'queries':>8}")
+        for total in self.table_sizes:
+            self.seed(owner, total)
+            deep = total - keyset.page_size * 2
+            last_page = deep // keyset.page_size
+
+            # Keyset pages start after the row ending the previous page
+            before = Post.objects.order_by(*keyset.ordering)[deep - 1]
+            cursor = keyset.encode_cursor(before)
+
+            modes = {
+                'page number': (
+                    '/posts/', f'/posts/?page={last_page}'
+                ),
+                'page no. no count': (
+                    '/posts/?count=false',
+                    f'/posts/?page={last_page}&count=false',
+                ),
+                'keyset': (
+                    '/posts/?pagination=keyset', f'/posts/?cursor={cursor}'
+                ),
+            }
+            for mode, (first_url, deep_url) in modes.items():
+                first_ms, _ = timed_get(self.client, first_url)
+                deep_ms, queries = timed_get(self.client, deep_url)
+                print(f'{total:>7} {mode:>18} {first_ms:>10.2f} '
+                      f'{deep_ms:>9.2f} {queries:>8}')
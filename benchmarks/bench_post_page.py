@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Post
+from .bench_pagination import timed_get
+
+
+class PostPageBenchmark(APITestCase):
+    """
+    Compares opening a post with the three requests the client makes
+    (PostDetail, CommentList?post= and ProfileDetail of the owner)
+    against the one /posts/<id>/page/ request, logged in with a session
+    cookie as the client is.
+    """
+    comment_count = 500
+
+    def test_page_against_three_requests(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(50)
+        ]
+        post = Post.objects.create(owner=users[1], title='a busy post')
+        Comment.objects.bulk_create(
+            (
+                Comment(owner=users[i % len(users)], post=post,
+                        content=f'comment {i}')
+                for i in range(self.comment_count)
+            ),
+            batch_size=1000,
+        )
+        Like.objects.create(owner=users[0], post=post)
+        Follower.objects.create(owner=users[0], followed=users[1])
+        self.client.login(username='user0', password='pass')
+
+        sequence = [
+            f'/posts/{post.id}/',
+            f'/comments/?post={post.id}',
+            f'/profiles/{users[1].profile.id}/',
+        ]
+        print()
+        print(f"{'endpoint':>28} {'ms':>8} {'queries':>8}")
+        total_ms = total_queries = 0
+        for url in sequence:
+            ms, queries = timed_get(self.client, url)
+            total_ms += ms
+            total_queries += queries
+            print(f'{url:>28} {ms:>8.2f} {queries:>8}')
+        print(f"{'three requests':>28} {total_ms:>8.2f} {total_queries:>8}")
+        page_ms, page_queries = timed_get(
+            self.client, f'/posts/{post.id}/page/'
+        )
+        print(f"{'/posts/<id>/page/':>28} {page_ms:>8.2f} {page_queries:>8}")
+        self.assertLess(page_queries, total_queries)
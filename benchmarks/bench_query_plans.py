@@ -0,0 +1,113 @@
+import json
+import re
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Post
+
+
+# The list view requests whose SQL has to stay on indexes
+LIST_VIEW_URLS = [
+    '/posts/',
+    '/posts/?pagination=keyset',
+    '/feed/',
+    '/posts/?owner__profile={profile}',
+    '/posts/?owner__followed__owner__profile={profile}',
+    '/posts/?likes__owner__profile={profile}',
+    '/posts/?ordering=-likes_count',
+    '/posts/?search=title',
+    '/category/travel/',
+    '/comments/?post={post}',
+    '/posts/{post}/comments/',
+    '/likes/',
+    '/followers/',
+    '/followers/lookup/?users={profile}',
+    '/profiles/',
+    '/profiles/?owner__following__followed__profile={profile}',
+    '/profiles/?ordering=-followers_count',
+]
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def sqlite_full_scans(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        detail for detail in details if SQLITE_FULL_SCAN.match(detail)
+    ]
+
+
+def postgres_full_scans(sql, params):
+    def walk(node):
+        if node['Node Type'] == 'Seq Scan':
+            yield f"Seq Scan on {node['Relation Name']}"
+        for child in node.get('Plans', []):
+            yield from walk(child)
+
+    with connection.cursor() as cursor:
+        # Tiny seeded tables make sequential scans cheapest, so only count
+        # one when the planner has no index path at all
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+    return list(walk(plan[0]['Plan']))
+
+
+class QueryPlanCheck(APITestCase):
+    """
+    Seeds a small social graph, captures the SQL of every list view and
+    fails if the database plans a sequential scan for any of it.
+    Works on SQLite and PostgreSQL.
+    """
+
+    def setUp(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(5)
+        ]
+        for owner in users:
+            post = Post.objects.create(
+                owner=owner, title='a title', category='travel'
+            )
+            for other in users:
+                Like.objects.create(owner=other, post=post)
+                Comment.objects.create(owner=other, post=post, content='hi')
+                if other != owner:
+                    Follower.objects.create(owner=owner, followed=other)
+        self.client.force_authenticate(users[0])
+        self.profile = users[0].profile.id
+        self.post = post.id
+
+    def explain(self, sql, params):
+        if connection.vendor == 'postgresql':
+            return postgres_full_scans(sql, params)
+        if connection.vendor == 'sqlite':
+            return sqlite_full_scans(sql, params)
+        self.skipTest(f'No plan check for {connection.vendor}')
+
+    def test_list_views_use_indexes(self):
+        failures = []
+        for url in LIST_VIEW_URLS:
+            url = url.format(profile=self.profile, post=self.post)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                # captured_queries holds the SQL with its parameters
+                # already quoted in by the backend
+                for scan in self.explain(sql, None):
+                    failures.append(f'{url}: {scan}\n    {sql}')
+
+        self.assertFalse(failures, '\n'.join(failures))
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from posts.models import Post
+from posts.search import index_posts
+from .bench_pagination import timed_get
+
+
+class SearchScalingBenchmark(APITestCase):
+    """
+    Times ?search= on /posts/ for a rare and a common term as the post
+    table grows. Matching and ranking must stay about linear in the
+    number of matches; a per-row MATCH made it quadratic before.
+    """
+    table_sizes = [1000, 4000, 16000]
+    # Every 20th post contains 'water'; every post contains 'the'
+    terms = ['water', 'the']
+    # Allowed growth of the time per post from the smallest table to the
+    # largest, which is 16 times as big
+    max_growth = 4
+
+    def seed(self, owner, total):
+        existing = Post.objects.count()
+        Post.objects.bulk_create(
+            Post(
+                owner=owner, title=f'post {i}',
+                content='the water' if i % 20 == 0 else 'the land',
+            )
+            for i in range(existing, total)
+        )
+        index_posts(
+            Post.objects.filter(pk__gt=existing).values_list(
+                'pk', 'title', 'content', 'owner__username'
+            ).iterator()
+        )
+
+    def test_search_scales_linearly(self):
+        owner = User.objects.create_user(username='adam', password='pass')
+        # Logged in, so repeat requests aren't served by the response cache
+        self.client.force_authenticate(owner)
+        print()
+        print(f"{'posts':>7} {'term':>6} {'ms':>9} {'us/post':>9}")
+        per_post = {term: [] for term in self.terms}
+        for total in self.table_sizes:
+            self.seed(owner, total)
+            for term in self.terms:
+                ms, _ = timed_get(
+                    self.client, f'/posts/?search={term}&count=false', runs=3
+                )
+                per_post[term].append(ms * 1000 / total)
+                print(f'{total:>7} {term:>6} {ms:>9.2f} '
+                      f'{per_post[term][-1]:>9.2f}')
+        for term, timings in per_post.items():
+            self.assertLess(timings[-1], timings[0] * self.max_growth, term)
@@ -0,0 +1,108 @@
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+from comments.models import Comment
+from comments.serializers import CommentSerializer, CommentValuesSerializer
+from drf_api.renderers import FastJSONRenderer
+from posts.models import Post
+from posts.serializers import PostSerializer, PostValuesSerializer
+from profiles.models import Profile
+from profiles.serializers import ProfileSerializer, ProfileValuesSerializer
+
+ROWS = 1000
+
+
+def best_of(function, runs=5):
+    # Fastest of a few runs in milliseconds, to keep noise out
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+class SerializationBenchmark(APITestCase):
+    """
+    Cost of loading, serializing and rendering 1,000 rows of posts,
+    comments and profiles with the ModelSerializers and JSONRenderer
+    against the values serializers and FastJSONRenderer.
+    """
+
+    def setUp(self):
+        # bulk_create skips the signals creating profiles, and doesn't
+        # set primary keys on SQLite, hence the reloads
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(ROWS)
+        )
+        users = list(User.objects.order_by('pk'))
+        Profile.objects.bulk_create(Profile(owner=user) for user in users)
+        Post.objects.bulk_create(
+            Post(owner=user, title=f'post {i}', content='lorem ipsum ' * 40)
+            for i, user in enumerate(users)
+        )
+        posts = list(Post.objects.order_by('pk'))
+        Comment.objects.bulk_create(
+            Comment(owner=user, post=post, content='a comment')
+            for user, post in zip(users, posts)
+        )
+        # Old enough that naturaltime gives the same text on every run
+        year_ago = timezone.now() - timedelta(days=400)
+        Comment.objects.update(created_at=year_ago, updated_at=year_ago)
+        request = APIRequestFactory().get('/')
+        request.user = users[0]
+        self.context = {'request': request}
+
+    def test_cost_per_thousand_rows(self):
+        cases = [
+            (
+                'posts',
+                Post.objects.with_like_id(self.context['request'].user),
+                PostSerializer, PostValuesSerializer, ('owner__profile',),
+            ),
+            (
+                'comments', Comment.objects.all(),
+                CommentSerializer, CommentValuesSerializer, ('owner__profile',),
+            ),
+            (
+                'profiles',
+                Profile.objects.with_following_id(self.context['request'].user),
+                ProfileSerializer, ProfileValuesSerializer, ('owner',),
+            ),
+        ]
+        json, fast_json = JSONRenderer(), FastJSONRenderer()
+        print()
+        print(f"{'rows':>9} {'serialize':>10} {'values':>8} "
+              f"{'render':>8} {'orjson':>8} {'before':>8} {'after':>8}")
+        for name, queryset, serializer_class, values_class, related in cases:
+            queryset = queryset[:ROWS]
+            serializer = serializer_class(context=self.context)
+
+            def model_serializer():
+                # The child serializer, so PostSerializer's body cache
+                # stays out of the numbers
+                return [
+                    serializer.to_representation(instance)
+                    for instance in queryset.select_related(*related)
+                ]
+
+            def values_serializer():
+                return values_class(
+                    values_class.values(queryset), context=self.context
+                ).data
+
+            data = model_serializer()
+            self.assertEqual(
+                json.render(data), fast_json.render(values_serializer())
+            )
+            serialize_ms = best_of(model_serializer)
+            values_ms = best_of(values_serializer)
+            render_ms = best_of(lambda: json.render(data))
+            orjson_ms = best_of(lambda: fast_json.render(data))
+            print(f'{name:>9} {serialize_ms:>10.2f} {values_ms:>8.2f} '
+                  f'{render_ms:>8.2f} {orjson_ms:>8.2f} '
+                  f'{serialize_ms + render_ms:>8.2f} '
+                  f'{values_ms + orjson_ms:>8.2f}')
@@ -0,0 +1,155 @@
+"""
+Load test harness for the benchmarks.
+
+A mix is a list of (weight, operation) pairs. An operation picks what to
+request from the seeded data and makes its requests through
+Session.request(), which times them and counts their queries under the
+operation's label, like 'GET /posts/<id>/'. replay() runs a number of
+operations drawn from a mix as randomly picked users; summarize() turns
+the samples into p50/p95 latency and query counts per label, which
+compare() checks against a baseline saved by an earlier run.
+"""
+import json
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from posts.models import Post
+
+
+def percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+class Session:
+    """
+    The test client, the seeded users and posts, and the samples of
+    the requests made so far.
+    """
+
+    def __init__(self, client, prefix='user', seed=0):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.users = list(
+            User.objects.filter(username__startswith=prefix)
+            .select_related('profile').order_by('pk')
+        )
+        # Popular posts are read more often, as on the real site
+        posts = Post.objects.order_by('pk').values_list('pk', 'likes_count')
+        self.post_ids = [pk for pk, likes in posts]
+        self.post_weights = [likes + 1 for pk, likes in posts]
+        self.samples = defaultdict(lambda: {'ms': [], 'queries': []})
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def post_id(self):
+        return self.rng.choices(self.post_ids, weights=self.post_weights)[0]
+
+    def request(self, label, user, method, url, data=None):
+        """
+        Make a request as user, or logged out if user is None, and record
+        its latency and query count under label.
+        """
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            if data is None:
+                response = getattr(self.client, method.lower())(url)
+            else:
+                response = getattr(self.client, method.lower())(
+                    url, data, format='json'
+                )
+            elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code < 400, (
+            f'{method} {url} returned {response.status_code}: '
+            f'{response.content[:200]}'
+        )
+        sample = self.samples[f'{method} {label}']
+        sample['ms'].append(elapsed)
+        sample['queries'].append(len(context.captured_queries))
+        return response
+
+
+def replay(session, mix, count):
+    """
+    Run count operations drawn from mix by weight.
+    """
+    weights = [weight for weight, operation in mix]
+    operations = [operation for weight, operation in mix]
+    for operation in session.rng.choices(operations, weights=weights, k=count):
+        operation(session)
+
+
+def summarize(samples):
+    # {label: {'requests', 'p50_ms', 'p95_ms', 'p50_queries', 'max_queries'}}
+    return {
+        label: {
+            'requests': len(sample['ms']),
+            'p50_ms': round(statistics.median(sample['ms']), 2),
+            'p95_ms': round(percentile(sample['ms'], 95), 2),
+            'p50_queries': statistics.median_low(sample['queries']),
+            'max_queries': max(sample['queries']),
+        }
+        for label, sample in sorted(samples.items())
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def compare(summary, baseline, latency_tolerance=None):
+    """
+    Print summary next to baseline and return the regressions: labels
+    making more queries than in the baseline and, given a tolerance like
+    1.5, labels whose p95 latency grew by more than that factor. Latency
+    is only reported otherwise, as it depends on the machine.
+    """
+    baseline = baseline or {}
+    regressions = []
+    print()
+    print(
+        f"{'operation':>44} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'queries':>8} {'p95 vs base':>12} {'base queries':>13}"
+    )
+    for label, row in summary.items():
+        base = baseline.get(label)
+        ratio = base_queries = ''
+        if base:
+            ratio = f"{row['p95_ms'] / max(base['p95_ms'], 0.01):.2f}x"
+            base_queries = base['max_queries']
+            if row['max_queries'] > base['max_queries']:
+                regressions.append(
+                    f"{label}: {row['max_queries']} queries, "
+                    f"{base['max_queries']} in the baseline"
+                )
+            if latency_tolerance and (
+                row['p95_ms'] > base['p95_ms'] * latency_tolerance
+            ):
+                regressions.append(
+                    f"{label}: p95 {row['p95_ms']}ms, "
+                    f"{base['p95_ms']}ms in the baseline"
+                )
+        print(
+            f"{label:>44} {row['requests']:>4} {row['p50_ms']:>8.2f} "
+            f"{row['p95_ms']:>8.2f} "
+            f"{row['p50_queries']:>3}/{row['max_queries']:<4} "
+            f"{ratio:>12} {base_queries:>13}"
+        )
+    return regressions
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from drf_api.cache import bump_tags
 from posts.models import Post
 
 
@@ -15,6 +17,45 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves keyset pagination on (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'], name='comment_keyset_idx'
+            ),
+            # Serves CommentList?post= in newest first order
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
     def __str__(self):
-        return self.content
\ No newline at end of file
+        return self.content
+
+
+# Keep Post.comments_count in step with the comments table using atomic
+# F() updates
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=models.F('comments_count') + 1
+        )
+
+
+def decrement_comments_count(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+        comments_count=models.F('comments_count') - 1
+    )
+
+
+post_save.connect(increment_comments_count, sender=Comment)
+post_delete.connect(decrement_comments_count, sender=Comment)
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Comments change the comments_count of their post
+    bump_tags('posts', f'post:{instance.post_id}')
+
+
+post_save.connect(invalidate_cached_responses, sender=Comment)
+post_delete.connect(invalidate_cached_responses, sender=Comment)
@@ -1,9 +1,12 @@
 from django.contrib.humanize.templatetags.humanize import naturaltime
 from rest_framework import serializers
+from drf_api.fields import SparseFieldsMixin
+from drf_api.values import ValuesSerializer
+from profiles.models import Profile
 from .models import Comment
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Comment model
     Adds three extra fields when returning a list of Comment instances
@@ -16,8 +19,8 @@ class CommentSerializer(serializers.ModelSerializer):
     updated_at = serializers.SerializerMethodField()
 
     def get_is_owner(self, obj):
-        request = self.context['request']
-        return request.user == obj.owner
+        # Compares ids, so the owner row isn't needed
+        return self.context['request'].user.pk == obj.owner_id
 
     def get_created_at(self, obj):
         return naturaltime(obj.created_at)
@@ -37,4 +40,94 @@ class CommentDetailSerializer(CommentSerializer):
     Serializer for the Comment model used in Detail view
     Post is a read only field so that we dont have to set it on each update
     """
-    post = serializers.ReadOnlyField(source='post.id')
\ No newline at end of file
+    post = serializers.ReadOnlyField(source='post.id')
+
+
+class CommentThreadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the comments of a post's thread
+    Timestamps are left as ISO 8601 strings for the client to humanize,
+    or passed through naturaltime by CommentThreadNaturalTimeSerializer
+    """
+    owner = serializers.ReadOnlyField(source='owner.username')
+    is_owner = serializers.SerializerMethodField()
+    profile_id = serializers.ReadOnlyField(source='owner.profile.id')
+    profile_image = serializers.ReadOnlyField(source='owner.profile.image.url')
+    # ISO 8601 rather than the '%d %b %Y' DATETIME_FORMAT, which drops
+    # the time of day a client needs to humanize them
+    created_at = serializers.DateTimeField(format='iso-8601', read_only=True)
+    updated_at = serializers.DateTimeField(format='iso-8601', read_only=True)
+
+    def get_is_owner(self, obj):
+        # Compares ids, so the owner row isn't needed
+        return self.context['request'].user.pk == obj.owner_id
+
+    class Meta:
+        model = Comment
+        fields = [
+            'id', 'owner', 'is_owner', 'profile_id', 'profile_image',
+            'post', 'created_at', 'updated_at', 'content'
+        ]
+        read_only_fields = fields
+
+
+class CommentThreadNaturalTimeSerializer(CommentThreadSerializer):
+    """
+    Serializer for a thread requested with ?humanize=true, with the same
+    "2 minutes ago" timestamps as CommentSerializer
+    """
+    created_at = serializers.SerializerMethodField()
+    updated_at = serializers.SerializerMethodField()
+
+    def get_created_at(self, obj):
+        return naturaltime(obj.created_at)
+
+    def get_updated_at(self, obj):
+        return naturaltime(obj.updated_at)
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """
+    Read-only CommentSerializer for .values() rows, with the same output
+    """
+    columns = (
+        'id', 'owner_id', 'owner__username', 'owner__profile__id',
+        'owner__profile__image', 'post_id', 'created_at', 'updated_at',
+        'content',
+    )
+    field_columns = {
+        'owner': ('owner__username',),
+        'profile_id': ('owner__profile__id',),
+        'profile_image': ('owner__profile__image',),
+        'content': ('content',),
+    }
+    profile_image_field = Profile._meta.get_field('image')
+
+    def datetime(self, value):
+        return naturaltime(value)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'owner': row['owner__username'],
+            'is_owner': self.is_owner(row['owner_id']),
+            'profile_id': row['owner__profile__id'],
+            'profile_image': self.file_url(
+                self.profile_image_field, row['owner__profile__image']
+            ),
+            'post': row['post_id'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+            'content': row['content'],
+        }
+
+
+class CommentThreadValuesSerializer(CommentValuesSerializer):
+    """
+    Read-only CommentThreadSerializer for .values() rows, with the same
+    output
+    """
+    datetime_field = serializers.DateTimeField(format='iso-8601')
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value)
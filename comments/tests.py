@@ -1,3 +1,197 @@
-from django.test import TestCase
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from posts.models import Post
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import Comment
+from .views import CommentList, PostCommentThread
 
-# Create your tests here.
+
+class CommentListViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        Comment.objects.create(owner=self.adam, post=self.post, content='hi')
+        one_comment = self.count_queries('/comments/')
+        for i in range(5):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            Comment.objects.create(owner=user, post=self.post, content='hi')
+        self.assertEqual(self.count_queries('/comments/'), one_comment)
+
+    def test_detail_owner_and_profile_come_from_one_query(self):
+        comment = Comment.objects.create(
+            owner=self.adam, post=self.post, content='hi'
+        )
+        # One query for the ETag validators, one for the comment
+        self.assertEqual(self.count_queries(f'/comments/{comment.id}/'), 2)
+
+    def test_matching_etag_returns_not_modified(self):
+        comment = Comment.objects.create(
+            owner=self.adam, post=self.post, content='hi'
+        )
+        url = f'/comments/{comment.id}/'
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(context.captured_queries), 1)
+
+        self.client.login(username='adam', password='pass')
+        self.client.put(url, {'content': 'edited'})
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_profile_changes_change_the_list_etag(self):
+        Comment.objects.create(owner=self.adam, post=self.post, content='hi')
+        etag = self.client.get('/comments/')['ETag']
+        profile = self.adam.profile
+        profile.name = 'Adam'
+        profile.save()
+        response = self.client.get('/comments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_humanized_etags_expire_as_the_times_change(self):
+        Comment.objects.create(owner=self.adam, post=self.post, content='hi')
+        with mock.patch('drf_api.conditional.time.time', return_value=6000):
+            etag = self.client.get('/comments/')['ETag']
+            response = self.client.get('/comments/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+        with mock.patch('drf_api.conditional.time.time', return_value=6060):
+            response = self.client.get('/comments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PostCommentThreadTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+        self.url = f'/posts/{self.post.id}/comments/'
+
+    def test_thread_pages_walk_every_comment_once(self):
+        other = Post.objects.create(owner=self.adam, title='another title')
+        Comment.objects.create(owner=self.adam, post=other, content='elsewhere')
+        Comment.objects.bulk_create(
+            Comment(owner=self.adam, post=self.post, content=f'comment {i}')
+            for i in range(25)
+        )
+        seen, url = [], self.url
+        while url:
+            response = self.client.get(url)
+            seen += [comment['id'] for comment in response.data['results']]
+            url = response.data['next']
+        expected = Comment.objects.filter(post=self.post).order_by(
+            '-created_at', '-id'
+        ).values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_page_query_count_does_not_grow_with_page_size(self):
+        Comment.objects.create(owner=self.adam, post=self.post, content='hi')
+        with CaptureQueriesContext(connection) as one_comment:
+            self.client.get(self.url)
+        for i in range(5):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            Comment.objects.create(owner=user, post=self.post, content='hi')
+        with CaptureQueriesContext(connection) as many_comments:
+            self.client.get(self.url)
+        self.assertEqual(
+            len(many_comments.captured_queries),
+            len(one_comment.captured_queries),
+        )
+
+    def test_timestamps_are_raw_unless_humanized(self):
+        comment = Comment.objects.create(
+            owner=self.adam, post=self.post, content='hi'
+        )
+        result = self.client.get(self.url).data['results'][0]
+        self.assertEqual(
+            result['created_at'],
+            comment.created_at.isoformat().replace('+00:00', 'Z'),
+        )
+        result = self.client.get(f'{self.url}?humanize=true').data['results'][0]
+        self.assertEqual(result['created_at'], 'now')
+
+    def test_unknown_post_returns_not_found(self):
+        response = self.client.get('/posts/999/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommentValuesSerializerTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+        for owner in [self.adam, brian]:
+            Comment.objects.create(
+                owner=owner, post=self.post,
+                content='Caf\u00e9 \U0001f600 line\u2028separator "quoted"',
+            )
+        self.client.force_authenticate(self.adam)
+
+    def assertSameAsModelSerializer(self, view, url, **slow):
+        fast = self.client.get(url)
+        with mock.patch.multiple(view, fast_json=False, **slow):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_comment_list_output_is_unchanged(self):
+        self.assertSameAsModelSerializer(
+            CommentList, '/comments/', values_serializer_class=None
+        )
+
+    def test_comment_thread_output_is_unchanged(self):
+        no_values = {'get_values_serializer_class': lambda view: None}
+        url = f'/posts/{self.post.id}/comments/'
+        self.assertSameAsModelSerializer(PostCommentThread, url, **no_values)
+        self.assertSameAsModelSerializer(
+            PostCommentThread, f'{url}?humanize=true', **no_values
+        )
+
+    def test_values_lists_skip_the_join_to_users(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/comments/')
+        page = context.captured_queries[-1]['sql']
+        self.assertNotIn('"auth_user"."password"', page)
+
+
+class CommentSparseFieldsTests(APITestCase):
+    def setUp(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=adam, title='a title')
+        Comment.objects.create(owner=adam, post=self.post, content='hi')
+
+    def test_omitted_relations_are_not_joined(self):
+        for url in ['/comments/', f'/posts/{self.post.id}/comments/']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    f'{url}?omit=owner,profile_id,profile_image'
+                )
+            self.assertEqual(list(response.data['results'][0]), [
+                'id', 'is_owner', 'post', 'created_at', 'updated_at',
+                'content',
+            ])
+            sql = ' '.join(query['sql'] for query in queries)
+            self.assertNotIn('profiles_profile', sql)
+            self.assertNotIn('auth_user', sql)
+
+    def test_output_matches_the_model_serializer(self):
+        url = '/comments/?fields=id,owner,profile_image,content'
+        fast = self.client.get(url)
+        with mock.patch.multiple(
+            CommentList, fast_json=False, values_serializer_class=None
+        ):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
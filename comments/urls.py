@@ -3,5 +3,6 @@ from comments import views
 
 urlpatterns = [
     path('comments/', views.CommentList.as_view()),
-    path('comments/<int:pk>/', views.CommentDetail.as_view())
-]
\ No newline at end of file
+    path('comments/<int:pk>/', views.CommentDetail.as_view()),
+    path('posts/<int:pk>/comments/', views.PostCommentThread.as_view()),
+]
@@ -1,19 +1,33 @@
 # Importing necessary classes and functions from Django REST framework and local modules
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_api.conditional import ConditionalDetailMixin, ConditionalListMixin
+from drf_api.mixins import SelectRelatedMixin
+from drf_api.pagination import FeedPagination, KeysetPagination
 from drf_api.permissions import IsOwnerOrReadOnly
+from drf_api.values import FastListMixin
+from posts.models import Post
 from .models import Comment
-from .serializers import CommentSerializer, CommentDetailSerializer
+from .serializers import (
+    CommentSerializer, CommentDetailSerializer, CommentThreadSerializer,
+    CommentThreadNaturalTimeSerializer, CommentThreadValuesSerializer,
+    CommentValuesSerializer,
+)
 
 # CommentList class-based view to handle the listing and creation of comments
-class CommentList(generics.ListCreateAPIView):
+class CommentList(FastListMixin, ConditionalListMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     """
     List comments or create a comment if logged in.
     This view handles GET requests to list all comments and POST requests to create a new comment.
     """
     serializer_class = CommentSerializer  # Specifies the serializer to use for formatting request/response data
+    values_serializer_class = CommentValuesSerializer  # Lists are built from .values() rows with the same output
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # Permissions - allow any read actions but restrict write actions to authenticated users
     queryset = Comment.objects.all()  # The queryset that represents the database query to be executed
+    pagination_class = FeedPagination  # Page numbers by default, keyset with ?pagination=keyset
+    etag_annotations = {'profile_updated_at': 'owner__profile__updated_at'}  # Profile names and images show on each item
+    etag_time_bucket = 60  # Seconds; the ETag changes as the "2 minutes ago" times do
 
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['post']
@@ -27,7 +41,7 @@ class CommentList(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)  # Save the comment instance with the owner field set to the currently authenticated user
 
 # CommentDetail class-based view for retrieving, updating, and deleting a specific comment
-class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetail(ConditionalDetailMixin, SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a specific comment.
     This view handles GET requests to retrieve a comment, PUT/PATCH requests to update a comment, and DELETE requests to delete a comment.
@@ -35,3 +49,40 @@ class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsOwnerOrReadOnly]  # Custom permission - allows operations only if the user is the owner of the comment
     serializer_class = CommentDetailSerializer  # Specifies the serializer for detailed comment data
     queryset = Comment.objects.all()  # The queryset for retrieving the comment from the database
+    validator_fields = ('updated_at', 'owner__profile__updated_at')  # Read by the cheap pre-query that answers conditional GETs
+    etag_time_bucket = 60  # Seconds; the ETag changes as the "2 minutes ago" times do
+
+# PostCommentThread class-based view for reading the comments of one post
+class PostCommentThread(FastListMixin, ConditionalListMixin, SelectRelatedMixin, generics.ListAPIView):
+    """
+    List the comments of a post, newest first, with keyset pagination.
+    Each page is one range scan of the (post, created_at, id) index joined
+    to the owners and their profiles. Timestamps are ISO 8601 unless
+    ?humanize=true asks for "2 minutes ago" style ones.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    queryset = Comment.objects.all()
+    pagination_class = KeysetPagination
+    etag_annotations = {'profile_updated_at': 'owner__profile__updated_at'}  # Profile names and images show on each item
+
+    def humanize(self):
+        return self.request.query_params.get('humanize', '').lower() == 'true'
+
+    def get_serializer_class(self):
+        if self.humanize():
+            return CommentThreadNaturalTimeSerializer
+        return CommentThreadSerializer
+
+    def get_etag_time_bucket(self):
+        # ISO 8601 times don't change, "2 minutes ago" ones do
+        return 60 if self.humanize() else None
+
+    def get_values_serializer_class(self):
+        if self.humanize():
+            return CommentValuesSerializer
+        return CommentThreadValuesSerializer
+
+    def get_queryset(self):
+        if not Post.objects.filter(pk=self.kwargs['pk']).exists():
+            raise NotFound()
+        return super().get_queryset().filter(post_id=self.kwargs['pk'])
@@ -0,0 +1,133 @@
+"""
+Response cache for anonymous GET requests.
+
+Rendered response bytes are stored under a key built from the view, the
+negotiated format and the full path with its query string. Each entry
+records the version token of the tags it depends on, e.g. 'posts' for a
+post list or 'post:<id>' for one post; bumping a tag from a model signal
+gives it a new token, so every entry recorded against the old one is
+treated as a miss. Only the cache API is used, so any Django cache
+backend configured as CACHES['responses'] works, with eviction left to
+the backend (MAX_ENTRIES on the local-memory cache, maxmemory-policy on
+Redis). Responses are only cached with settings.RESPONSE_CACHE on, as a
+per-process cache would go on serving entries a write in another worker
+invalidated.
+"""
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+CACHE_ALIAS = 'responses'
+# Headers stored and replayed along with the cached body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Vary')
+
+
+def tag_key(tag):
+    return f'response-tag:{tag}'
+
+
+def set_new_versions(tags):
+    caches[CACHE_ALIAS].set_many(
+        {tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None
+    )
+
+
+def bump_tags(*tags):
+    """
+    Invalidate every cached response depending on any of the tags. Inside
+    a transaction the tags are bumped again once it commits, as a request
+    reading in between still sees the old rows and may cache them against
+    the new versions.
+    """
+    set_new_versions(tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: set_new_versions(tags))
+
+
+def current_versions(tags):
+    cache = caches[CACHE_ALIAS]
+    keys = {tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    # A tag evicted from the cache gets a fresh token, which can't match
+    # anything stored against the old one
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Serves repeat anonymous GETs of a view from the response cache.
+    Views list the tags their responses depend on in cache_tags, and can
+    add object-specific ones in get_cache_tags.
+    """
+    cache_tags = ()
+
+    def get_cache_tags(self):
+        return list(self.cache_tags)
+
+    def get_object(self):
+        # Remembered so detail views can tag responses with their object
+        self.object = super().get_object()
+        return self.object
+
+    def uses_response_cache(self, request):
+        return (
+            settings.RESPONSE_CACHE
+            and request.method == 'GET'
+            and not request.user.is_authenticated
+        )
+
+    def response_cache_key(self, request):
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return (
+            f'response:{type(self).__name__}:'
+            f'{request.accepted_renderer.format}:{path}'
+        )
+
+    def get(self, request, *args, **kwargs):
+        if self.uses_response_cache(request):
+            entry = caches[CACHE_ALIAS].get(self.response_cache_key(request))
+            if entry is not None:
+                content, headers, versions = entry
+                if current_versions(versions) == versions:
+                    response = get_conditional_response(
+                        request, etag=headers.get('ETag')
+                    ) or HttpResponse(content)
+                    for header, value in headers.items():
+                        response[header] = value
+                    response['X-Cache'] = 'HIT'
+                    return response
+            # Read before the queries run, so a write landing while the
+            # response is built leaves the stored entry already stale
+            self.versions_before = current_versions(self.cache_tags)
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Cache hits are plain HttpResponses and are left alone
+        if (
+            isinstance(response, Response)
+            and response.status_code == 200
+            and self.uses_response_cache(request)
+        ):
+            versions = current_versions(self.get_cache_tags())
+            versions.update(getattr(self, 'versions_before', {}))
+            response.render()
+            headers = {
+                header: response[header] for header in CACHED_HEADERS
+                if header in response
+            }
+            caches[CACHE_ALIAS].set(
+                self.response_cache_key(request),
+                (response.content, headers, versions),
+            )
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,131 @@
+"""
+Conditional GET support (ETag/Last-Modified, If-None-Match and
+If-Modified-Since) for the detail and list views.
+
+ETags include the requesting user, as is_owner, like_id and following_id
+differ between viewers. Stored counters, viewer state and related rows
+don't move updated_at, so Last-Modified is only sent by detail views
+validated by updated_at alone; the others rely on the ETag. Views showing
+"2 minutes ago" style times set etag_time_bucket, so their ETags also
+change every that many seconds as the text does.
+"""
+import hashlib
+import time
+from calendar import timegm
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .mixins import related_paths
+
+
+def make_etag(parts, weak=False):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie', 'Authorization'))
+    return response
+
+
+class ConditionalMixin:
+    etag_time_bucket = None
+
+    def get_etag_time_bucket(self):
+        return self.etag_time_bucket
+
+    def etag_viewer(self, request):
+        # What besides the rows an ETag depends on
+        bucket = self.get_etag_time_bucket()
+        return request.user.pk, int(time.time() // bucket) if bucket else None
+
+
+class ConditionalDetailMixin(ConditionalMixin):
+    """
+    Answers conditional GETs of a detail view from a cheap pre-query that
+    selects only validator_fields of the object, returning 304 Not
+    Modified without fetching or serializing the full object.
+    """
+    validator_fields = ('updated_at',)
+
+    def get_validator_queryset(self):
+        return self.queryset.model._default_manager.filter(
+            pk=self.kwargs['pk']
+        )
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validator_queryset().values(
+            *self.validator_fields
+        ).first()
+        if validators is None:
+            # Let the view raise its usual 404
+            return super().get(request, *args, **kwargs)
+
+        etag = make_etag((
+            self.etag_viewer(request), sorted(validators.items())
+        ))
+        last_modified = None
+        if tuple(validators) == ('updated_at',):
+            last_modified = timegm(validators['updated_at'].utctimetuple())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalMixin):
+    """
+    Gives list views a weak ETag built from the ids, updated_at and
+    etag_fields of the rows on the page, checked before the page is
+    serialized. etag_annotations maps names to lookups of related rows
+    the items show, like the owner's profile, which are annotated onto
+    the page query for the ETag.
+    """
+    etag_fields = ()
+    etag_annotations = {}
+
+    def page_etag(self, request, rows):
+        # Rows are model instances, or dicts from a values serializer
+        rows = [row if isinstance(row, dict) else row.__dict__ for row in rows]
+        names = (*self.etag_fields, *self.etag_annotations)
+        return make_etag((self.etag_viewer(request), [
+            (row['id'], row['updated_at'])
+            + tuple(row.get(name) for name in names)
+            for row in rows
+        ]), weak=True)
+
+    def get_etag_annotations(self):
+        # Relations that no kept field reads aren't joined for the ETag
+        paths = related_paths(
+            self.get_serializer_class(), self.selected_fields()
+        )
+        return {
+            name: F(lookup) for name, lookup in self.etag_annotations.items()
+            if lookup.rsplit('__', 1)[0] in paths
+        }
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        annotations = self.get_etag_annotations()
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        etag = self.page_etag(request, rows)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            serializer = self.get_serializer(rows, many=True)
+            if page is not None:
+                response = self.get_paginated_response(serializer.data)
+            else:
+                response = Response(serializer.data)
+        return set_validators(response, etag)
@@ -0,0 +1,111 @@
+"""
+Streaming NDJSON export of a user's posts, comments, likes and follows.
+
+Rows are read with .iterator(chunk_size=EXPORT_CHUNK_SIZE), a server-side
+cursor on PostgreSQL, and streamed out in blocks of lines, so memory use
+doesn't grow with the size of the export. Sections are exported in the
+order of EXPORT_SECTIONS, each by ascending id. Every line carries a
+cursor of its type and id; passing the last one received as ?cursor=
+resumes the export after that row.
+"""
+from django.conf import settings
+from django.db import models
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+from comments.models import Comment
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Post
+from .renderers import FastJSONRenderer
+
+# (type, model, owner field, exported columns), in export order
+EXPORT_SECTIONS = [
+    ('post', Post, 'owner', (
+        'id', 'created_at', 'updated_at', 'title', 'content', 'category',
+        'image', 'image_filter',
+    )),
+    ('comment', Comment, 'owner', (
+        'id', 'post_id', 'created_at', 'updated_at', 'content',
+    )),
+    ('like', Like, 'owner', ('id', 'post_id', 'created_at')),
+    ('follow', Follower, 'owner', ('id', 'followed_id', 'created_at')),
+]
+SECTION_TYPES = [section[0] for section in EXPORT_SECTIONS]
+# Lines are sent in blocks of about this many bytes rather than one by one
+BLOCK_SIZE = 64 * 1024
+
+
+def parse_cursor(cursor):
+    """
+    Split a 'type:id' cursor into the index of its section and the id.
+    """
+    try:
+        kind, pk = cursor.split(':')
+        return SECTION_TYPES.index(kind), int(pk)
+    except ValueError:
+        raise ValidationError({'cursor': 'Expected a cursor like post:123.'})
+
+
+def export_blocks(user, position=(0, 0)):
+    """
+    Yield the NDJSON of user's export in blocks of whole lines, starting
+    after position.
+    """
+    block = []
+    size = 0
+    for line in export_lines(user, position):
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def export_lines(user, position=(0, 0)):
+    """
+    Yield the NDJSON lines of user's export, starting after position.
+    """
+    renderer = FastJSONRenderer()
+    start, after = position
+    for index, (kind, model, owner_field, columns) in enumerate(
+        EXPORT_SECTIONS
+    ):
+        if index < start:
+            continue
+        rows = model.objects.filter(**{owner_field: user})
+        if index == start:
+            rows = rows.filter(pk__gt=after)
+        rows = rows.order_by('pk').values(*columns)
+        # Files are exported as their URLs
+        files = {
+            field.name: field.storage for field in model._meta.fields
+            if isinstance(field, models.FileField) and field.name in columns
+        }
+        for row in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            for name, storage in files.items():
+                row[name] = storage.url(row[name]) if row[name] else None
+            row['type'] = kind
+            row['cursor'] = f"{kind}:{row['id']}"
+            yield renderer.render(row) + b'\n'
+
+
+class ExportView(APIView):
+    """
+    Stream everything the logged in user has posted, commented, liked and
+    followed as newline delimited JSON, resuming after ?cursor= if given.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        cursor = request.query_params.get('cursor')
+        position = parse_cursor(cursor) if cursor else (0, 0)
+        response = StreamingHttpResponse(
+            export_blocks(request.user, position),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = 'attachment; filename="export.ndjson"'
+        return response
@@ -0,0 +1,92 @@
+"""
+Sparse fieldsets for GET requests.
+
+?fields=id,title keeps only the listed fields of a response, or of each
+item of a list, and ?omit=content,like_id drops the listed ones.
+Serializers opt in with SparseFieldsMixin. Views read the same selection
+from SparseFieldsViewMixin.selected_fields() to leave out whatever only
+omitted fields need: the joins made by SelectRelatedMixin, annotations
+like like_id and following_id, and the columns of values serializers.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def field_list(request, param):
+    # request.GET, as serializers can be given a plain HttpRequest
+    value = request.GET.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def selected_fields(request, names):
+    """
+    The field names, in their order, that the request's ?fields= and
+    ?omit= select from names. Only GET requests are trimmed.
+    """
+    names = list(names)
+    if request is None or request.method != 'GET':
+        return names
+    kept = field_list(request, 'fields')
+    if kept == []:
+        raise ValidationError({'fields': 'No fields listed.'})
+    omitted = field_list(request, 'omit') or []
+    unknown = [name for name in (kept or []) + omitted if name not in names]
+    if unknown:
+        raise ValidationError(
+            {'fields': f"Unknown field(s): {', '.join(unknown)}."}
+        )
+    return [
+        name for name in names
+        if (kept is None or name in kept) and name not in omitted
+    ]
+
+
+@lru_cache(maxsize=None)
+def serializer_field_names(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin trimming its fields to the request's ?fields= and
+    ?omit= when it is the top level serializer of a response, or the
+    child of a top level list. Views combining several serializers in one
+    response turn it off with sparse_fields=False in the context.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if not self.context.get('sparse_fields', True):
+            return fields
+        if parent is not None and not (
+            isinstance(parent, serializers.ListSerializer)
+            and parent.parent is None
+        ):
+            return fields
+        return OrderedDict(
+            (name, fields[name])
+            for name in selected_fields(self.context.get('request'), fields)
+        )
+
+
+class SparseFieldsViewMixin:
+    """
+    Gives views the fields of their serializer that the request selects,
+    for pruning the queryset.
+    """
+
+    def selected_fields(self):
+        if getattr(self, '_selected_fields', None) is None:
+            self._selected_fields = tuple(selected_fields(
+                self.request,
+                serializer_field_names(self.get_serializer_class()),
+            ))
+        return self._selected_fields
+
+    def wants(self, field_name):
+        return field_name in self.selected_fields()
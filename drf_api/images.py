@@ -0,0 +1,365 @@
+"""
+Background pipeline for post and profile images.
+
+An upload is checked from its header alone, written to local staging and
+its post or profile saved as 'pending', so the request doesn't wait on
+decoding the image or on the transfer to storage. Once the transaction
+commits, a pool of IMAGE_PIPELINE_WORKERS threads decodes the staged
+file, scales it down to fit IMAGE_MAX_DIMENSION, saves it to the image
+field's storage (DEFAULT_FILE_STORAGE) along with the recompressed
+IMAGE_RENDITIONS, and marks the row 'ready', or 'failed' if the file
+isn't a usable image or storage kept failing after IMAGE_PIPELINE_RETRIES
+retries. Rows left pending by a restart are picked up by the
+process_pending_images command.
+
+Models taking part have image, image_status, staged_image and
+image_renditions fields.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, models, transaction
+from PIL import Image
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Formats accepted for upload
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+class ImageStatus(models.TextChoices):
+    # Where a row's image is in the pipeline
+    READY = 'ready'
+    PENDING = 'pending'
+    FAILED = 'failed'
+
+
+class ImageRejected(Exception):
+    """
+    The staged file isn't an image the pipeline can store.
+    """
+
+
+def staging_storage():
+    return FileSystemStorage(location=settings.IMAGE_STAGING_ROOT)
+
+
+def stage_upload(upload):
+    """
+    Write an uploaded file to staging and return its staged name.
+    """
+    extension = os.path.splitext(upload.name)[1].lower()
+    return staging_storage().save(f'{uuid.uuid4().hex}{extension}', upload)
+
+
+def open_staged(staged):
+    """
+    Decode a staged image, returning its bytes and the loaded image.
+    """
+    with staging_storage().open(staged) as file:
+        data = file.read()
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ImageRejected(str(exc))
+    return data, image
+
+
+def encode(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def original_content(data, image):
+    """
+    The stored original: the upload as it is, or scaled down to fit
+    IMAGE_MAX_DIMENSION if it is larger.
+    """
+    limit = settings.IMAGE_MAX_DIMENSION
+    if max(image.size) <= limit:
+        return ContentFile(data)
+    scaled = image.copy()
+    scaled.thumbnail((limit, limit))
+    return encode(scaled, image.format)
+
+
+def renditions(image):
+    """
+    Yield (name, extension, content) for each of IMAGE_RENDITIONS,
+    recompressed as JPEG, or PNG for images with transparency.
+    """
+    transparent = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    # Largest first, so each rendition is scaled from the one before
+    sizes = sorted(
+        settings.IMAGE_RENDITIONS.items(), key=lambda item: -item[1]
+    )
+    scaled = image.convert('RGBA' if transparent else 'RGB')
+    for name, size in sizes:
+        scaled.thumbnail((size, size))
+        if transparent:
+            yield name, 'png', encode(scaled, 'PNG', optimize=True)
+        else:
+            yield name, 'jpg', encode(
+                scaled, 'JPEG', quality=settings.IMAGE_RENDITION_QUALITY,
+                optimize=True, progressive=True,
+            )
+
+
+def with_retries(store, description):
+    """
+    Call store(), retrying storage errors with a doubling delay.
+    """
+    delay = settings.IMAGE_PIPELINE_RETRY_DELAY
+    for retry in range(settings.IMAGE_PIPELINE_RETRIES + 1):
+        try:
+            return store()
+        except Exception:
+            # Storage backends raise their own errors for network failures
+            if retry == settings.IMAGE_PIPELINE_RETRIES:
+                raise
+            logger.warning(
+                'Storing %s failed, retrying in %ss', description, delay,
+                exc_info=True,
+            )
+            time.sleep(delay)
+            delay *= 2
+
+
+def store_image(instance, staged):
+    """
+    Store the staged image of instance and its renditions, returning the
+    stored original's name and {rendition: name}.
+    """
+    data, image = open_staged(staged)
+    field = instance.image
+    description = f'the image of {instance._meta.label} {instance.pk}'
+    stored = []
+    try:
+        with_retries(
+            lambda: field.save(
+                os.path.basename(staged), original_content(data, image),
+                save=False,
+            ),
+            description,
+        )
+        stored.append(field.name)
+        stem = os.path.splitext(field.name)[0]
+        names = {}
+        for name, extension, content in renditions(image):
+            names[name] = with_retries(
+                lambda: field.storage.save(
+                    f'{stem}_{name}.{extension}', content
+                ),
+                description,
+            )
+            stored.append(names[name])
+    except Exception:
+        for name in stored:
+            field.storage.delete(name)
+        raise
+    return field.name, names
+
+
+def process_image(model, pk):
+    """
+    Run the staged image of a pending row of model through the pipeline.
+    """
+    instance = model._default_manager.filter(
+        pk=pk, image_status=ImageStatus.PENDING
+    ).exclude(staged_image='').first()
+    if instance is None:
+        # Deleted, or already processed
+        return
+    staged = instance.staged_image
+
+    status, stored = ImageStatus.READY, None
+    try:
+        stored = store_image(instance, staged)
+    except ImageRejected as exc:
+        logger.info('Rejected the image of %s %s: %s', model._meta.label, pk, exc)
+        status = ImageStatus.FAILED
+    except Exception:
+        logger.exception(
+            'Could not store the image of %s %s', model._meta.label, pk
+        )
+        status = ImageStatus.FAILED
+
+    with transaction.atomic():
+        # Only finish if no newer upload replaced the staged file meanwhile.
+        # save() sends post_save, so cached responses are dropped as usual.
+        current = model._default_manager.select_for_update().filter(
+            pk=pk, staged_image=staged
+        ).first()
+        if current is not None:
+            current.image_status = status
+            current.staged_image = ''
+            fields = ['image_status', 'staged_image', 'updated_at']
+            if stored is not None:
+                current.image, current.image_renditions = stored
+                fields += ['image', 'image_renditions']
+            current.save(update_fields=fields)
+
+    if current is not None:
+        staging_storage().delete(staged)
+    elif stored is not None:
+        image, names = stored
+        for name in [image, *names.values()]:
+            instance.image.storage.delete(name)
+
+
+def run_in_worker(model, pk):
+    try:
+        process_image(model, pk)
+    except Exception:
+        logger.exception(
+            'Image pipeline failed for %s %s', model._meta.label, pk
+        )
+    finally:
+        # Worker threads have their own database connections
+        connection.close()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                thread_name_prefix='image-pipeline',
+            )
+        return _executor
+
+
+def submit(model, pk):
+    if settings.IMAGE_PIPELINE_WORKERS:
+        executor().submit(run_in_worker, model, pk)
+    else:
+        process_image(model, pk)
+
+
+def schedule(instance):
+    """
+    Process the staged image of instance once the current transaction
+    commits.
+    """
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: submit(model, pk))
+
+
+def discard_staged_image(sender, instance, **kwargs):
+    # post_delete handler for the models in the pipeline
+    if instance.staged_image:
+        staging_storage().delete(instance.staged_image)
+
+
+def rendition_urls(image_url, renditions, url):
+    """
+    {rendition: URL} for each of IMAGE_RENDITIONS, url giving the URL of
+    a stored name. Images without renditions, like the defaults and those
+    stored before renditions were made, fall back to image_url.
+    """
+    renditions = renditions or {}
+    return {
+        name: url(renditions[name]) if name in renditions else image_url
+        for name in settings.IMAGE_RENDITIONS
+    }
+
+
+class HeaderImageField(serializers.FileField):
+    """
+    Image upload field that checks the format and dimensions from the
+    file's header, without decoding the image like ImageField does.
+    """
+    default_error_messages = {
+        'invalid_image': (
+            'Upload a valid image. The file you uploaded was either not an '
+            'image or a corrupted image.'
+        ),
+        'too_large': 'Image larger than {limit}px!',
+    }
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            # Image.open only parses the header; the bitmap is decoded
+            # later by the pipeline
+            with Image.open(file) as image:
+                image_format, size = image.format, image.size
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        if image_format not in IMAGE_FORMATS:
+            self.fail('invalid_image')
+        limit = settings.IMAGE_MAX_UPLOAD_DIMENSION
+        if max(size) > limit:
+            self.fail('too_large', limit=limit)
+        file.seek(0)
+        return file
+
+
+class ImagePipelineSerializerMixin(serializers.Serializer):
+    """
+    For ModelSerializers of models in the image pipeline. New images go
+    to local staging instead of straight to storage, and the row waits as
+    'pending' until the pipeline has stored them.
+    """
+    image = HeaderImageField(required=False)
+    image_status = serializers.ReadOnlyField()
+    image_renditions = serializers.SerializerMethodField()
+
+    def get_image_renditions(self, obj):
+        request = self.context.get('request')
+
+        def url(name):
+            # As the image field represents its own URL
+            url = obj.image.storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return rendition_urls(
+            url(obj.image.name) if obj.image else None,
+            obj.image_renditions, url,
+        )
+
+    def stage_image(self, validated_data):
+        upload = validated_data.pop('image', None)
+        if upload is None:
+            return False
+        validated_data['staged_image'] = stage_upload(upload)
+        validated_data['image_status'] = ImageStatus.PENDING
+        return True
+
+    def create(self, validated_data):
+        staged = self.stage_image(validated_data)
+        instance = super().create(validated_data)
+        if staged:
+            schedule(instance)
+        return instance
+
+    def update(self, instance, validated_data):
+        replaced = instance.staged_image
+        staged = self.stage_image(validated_data)
+        # Only the submitted fields are written: a full save would put back
+        # the image and status the instance was loaded with, undoing the
+        # pipeline if it finished the row in the meantime
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        if staged:
+            if replaced:
+                staging_storage().delete(replaced)
+            schedule(instance)
+        return instance
@@ -0,0 +1,218 @@
+"""
+Opt-in per-request instrumentation.
+
+InstrumentationMiddleware measures a sample of requests: the number and
+total time of their SQL queries, the time spent in serializer .data and
+in rendering the response, and the total. Each measured request gets a
+Server-Timing header, readable in the browser's network panel, and a
+JSON log line on the 'drf_api.instrumentation' logger naming the
+resolved view. The body of a streaming response, like /export/'s, is
+produced as the server iterates it, after the middleware has returned,
+so its queries and total are measured until the stream closes; its
+headers are sent by then, so it only gets the log line. An
+INSTRUMENTATION_BUDGETS entry for the view, or for
+the method and view, caps any of those numbers; going over it logs a
+warning, or raises BudgetExceeded when INSTRUMENTATION_BUDGET_ACTION is
+'raise', which fails the test making the request.
+
+With INSTRUMENTATION_SAMPLE_RATE at 0, the default, the middleware takes
+itself out of the stack at startup. Requests that aren't sampled only
+cost a random() call.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from .values import ValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+# The metrics of the request being measured in this thread, if any
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class BudgetExceeded(AssertionError):
+    """
+    A view went over its INSTRUMENTATION_BUDGETS entry.
+    """
+
+
+class RequestMetrics:
+    """
+    What one request spent, in milliseconds.
+    """
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        # Set while a serializer or renderer is being timed
+        self.timing = False
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'sql_ms': round(self.sql_ms, 2),
+            'serialize_ms': round(self.serialize_ms, 2),
+            'render_ms': round(self.render_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+        }
+
+    def server_timing(self):
+        return ', '.join([
+            f'sql;dur={self.sql_ms:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize_ms:.2f}',
+            f'render;dur={self.render_ms:.2f}',
+            f'total;dur={self.total_ms:.2f}',
+        ])
+
+    def over_budget(self, budget):
+        # {'queries': 5, 'sql_ms': 20, ...} -> the limits that were passed
+        values = self.as_dict()
+        return {
+            name: (values[name], limit) for name, limit in budget.items()
+            if values[name] > limit
+        }
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_ms += (time.perf_counter() - start) * 1000
+
+
+def measure_queries(metrics):
+    # Counts and times the queries run on any database connection until
+    # the returned context exits
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(
+            connection.execute_wrapper(metrics.execute_wrapper)
+        )
+    return stack
+
+
+def timed(fget, metric):
+    # Wraps a property getter to add its time to the request's metric
+    def timed_fget(instance):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.timing:
+            # Nested calls are part of the outer one's time
+            return fget(instance)
+        metrics.timing = True
+        start = time.perf_counter()
+        try:
+            return fget(instance)
+        finally:
+            metrics.timing = False
+            setattr(metrics, metric, getattr(metrics, metric) + (
+                time.perf_counter() - start
+            ) * 1000)
+    timed_fget.timed = True
+    return property(timed_fget)
+
+
+def instrument():
+    """
+    Time .data of DRF serializers and of the values serializers, and the
+    rendering of DRF responses, which can happen in the view, as the
+    response cache does. Done once, when the middleware is loaded, as DRF
+    has no hooks around either.
+    """
+    for cls, name, metric in [
+        (BaseSerializer, 'data', 'serialize_ms'),
+        (ValuesSerializer, 'data', 'serialize_ms'),
+        (Response, 'rendered_content', 'render_ms'),
+    ]:
+        fget = getattr(cls, name).fget
+        if not getattr(fget, 'timed', False):
+            setattr(cls, name, timed(fget, metric))
+
+
+class InstrumentationMiddleware:
+    """
+    Measures sampled requests, see the module docstring. Goes first in
+    MIDDLEWARE so the total covers the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_SAMPLE_RATE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with measure_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        if response.streaming:
+            response.streaming_content = self.measured_stream(
+                response.streaming_content, request, response, metrics, start
+            )
+            return response
+        self.report(request, response, metrics, start)
+        return response
+
+    def measured_stream(self, content, request, response, metrics, start):
+        try:
+            with measure_queries(metrics):
+                yield from content
+        finally:
+            # Also when the client goes away and the stream is closed early
+            self.report(request, response, metrics, start)
+
+    def report(self, request, response, metrics, start):
+        metrics.total_ms = (time.perf_counter() - start) * 1000
+        if settings.INSTRUMENTATION_SERVER_TIMING and not response.streaming:
+            response['Server-Timing'] = metrics.server_timing()
+        logger.info(json.dumps(dict(
+            metrics.as_dict(), method=request.method,
+            status=response.status_code,
+        )))
+        self.check_budget(request.method, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'metrics'):
+            request.metrics.view = request.resolver_match.view_name
+
+    def check_budget(self, method, metrics):
+        # Budgets are keyed by 'METHOD view', or by view for every method
+        budgets = settings.INSTRUMENTATION_BUDGETS
+        budget = budgets.get(
+            f'{method} {metrics.view}', budgets.get(metrics.view)
+        )
+        if not budget:
+            return
+        over = metrics.over_budget(budget)
+        if not over:
+            return
+        message = '{} went over its budget: {}'.format(metrics.view, ', '.join(
+            f'{name} {value} > {limit}'
+            for name, (value, limit) in over.items()
+        ))
+        if settings.INSTRUMENTATION_BUDGET_ACTION == 'raise':
+            raise BudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from .fields import SparseFieldsViewMixin
+
+
+@lru_cache(maxsize=None)
+def related_paths(serializer_class, field_names=None):
+    """
+    Work out the select_related() paths a serializer needs by walking the
+    dotted sources of its fields, e.g. source='owner.profile.image.url'
+    on a Post serializer gives 'owner__profile'. Method fields can give
+    theirs in Meta.related_sources. With field_names, only those fields
+    are considered.
+    """
+    model = serializer_class.Meta.model
+    related_sources = getattr(serializer_class.Meta, 'related_sources', {})
+    paths = set()
+    for name, field in serializer_class().fields.items():
+        if field_names is not None and name not in field_names:
+            continue
+        source = related_sources.get(name, field.source)
+        if source == '*' or '.' not in source:
+            continue
+        current, path = model, []
+        for attr in source.split('.'):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            # Only single-valued relations can be joined by select_related
+            if not (model_field.many_to_one or model_field.one_to_one):
+                break
+            path.append(attr)
+            current = model_field.related_model
+        if path:
+            paths.add('__'.join(path))
+    # 'owner' is already joined by 'owner__profile'
+    return tuple(sorted(
+        path for path in paths
+        if not any(other.startswith(path + '__') for other in paths)
+    ))
+
+
+class SelectRelatedMixin(SparseFieldsViewMixin):
+    """
+    Joins the relations read by the view's serializer into the queryset,
+    so a page of rows doesn't lazily load each owner and profile.
+    Relations only read by fields the request omits are left out.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        paths = related_paths(
+            self.get_serializer_class(), self.selected_fields()
+        )
+        return queryset.select_related(*paths) if paths else queryset
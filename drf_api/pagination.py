@@ -0,0 +1,171 @@
+import base64
+from collections import OrderedDict
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def after_position(queryset, position, id_field='pk'):
+    """
+    Filter a newest first queryset down to the rows after a
+    (created_at, id) keyset position.
+    """
+    created_at, pk = position
+    # The leading created_at__lte lets the database seek the
+    # (created_at, id) index instead of scanning for the OR
+    return queryset.filter(created_at__lte=created_at).filter(
+        Q(created_at__lt=created_at) | Q(**{f'{id_field}__lt': pk})
+    )
+
+
+def wants_count(request, default):
+    # ?count=false skips the COUNT(*) query, ?count=true asks for it
+    value = request.query_params.get('count')
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on (created_at, id), newest first.
+    Each page is a range scan starting after the last row of the previous
+    page, so deep pages cost the same as the first one. The total count is
+    left out unless the client asks for it with ?count=true.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    include_count = False
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = (
+            queryset.count() if wants_count(request, self.include_count)
+            else None
+        )
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = after_position(queryset, position)
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def encode_cursor(self, instance):
+        # Rows are model instances, or dicts from a values serializer
+        if isinstance(instance, dict):
+            created_at, pk = instance['created_at'], instance['id']
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        position = f'{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, pk = position.rsplit('|', 1)
+            created_at, pk = parse_datetime(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
+
+
+class FeedPagination(PageNumberPagination):
+    """
+    Page number pagination for the feed views that can switch per request:
+    ?pagination=keyset (or a ?cursor= from a keyset page) hands over to
+    KeysetPagination, and ?count=false skips the COUNT(*) query.
+    Custom ?ordering= always stays on page numbers, as the keyset only
+    follows (created_at, id).
+    """
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'keyset'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if wants_count(request, True):
+            self.uncounted = False
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_without_count(queryset, request)
+
+    def paginate_without_count(self, queryset, request):
+        self.request = request
+        self.uncounted = True
+        try:
+            self.number = max(int(
+                request.query_params.get(self.page_query_param, 1)
+            ), 1)
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.number - 1) * self.page_size
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        if not rows and self.number > 1:
+            raise NotFound(self.invalid_page_message)
+        self.has_next = len(rows) > self.page_size
+        return rows[:self.page_size]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if not self.uncounted:
+            return super().get_paginated_response(data)
+
+        url = self.request.build_absolute_uri()
+        next_link = previous_link = None
+        if self.has_next:
+            next_link = replace_query_param(
+                url, self.page_query_param, self.number + 1
+            )
+        if self.number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        elif self.number > 2:
+            previous_link = replace_query_param(
+                url, self.page_query_param, self.number - 1
+            )
+        return Response(OrderedDict([
+            ('next', next_link),
+            ('previous', previous_link),
+            ('results', data),
+        ]))
@@ -0,0 +1,228 @@
+"""
+Synthetic social graph for load tests and benchmarks.
+
+Real social graphs are heavy tailed: a few users draw most of the
+follows, likes and comments, and a few write most of the posts. Every
+generated user gets a Pareto distributed popularity and activity; follows
+and likes pick their targets in proportion to popularity, and how much a
+user posts, follows and comments goes with their activity. The same seed
+always gives the same graph.
+
+Rows are bulk inserted, skipping the model signals, so the denormalized
+counters, the search index and the feed timelines are rebuilt afterwards
+in one pass each.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from io import StringIO
+from itertools import accumulate
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from comments.models import Comment
+from feed.models import TimelineEntry
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Categories, Post, make_excerpt
+from profiles.models import Profile
+from .cache import bump_tags
+
+# Shape of the Pareto distributions; lower is more skewed
+PARETO_ALPHA = 1.5
+BATCH_SIZE = 1000
+WORDS = (
+    'the a of to and in is it you that he was for on are with as his they '
+    'be at one have this from or had by hot word but what some we can out '
+    'other were all there when up use your how said an each she which do '
+    'their time if will way about many then them write would like so these '
+    'her long make thing see him two has look more day could go come did '
+    'number sound no most people my over know water than call first who may'
+).split()
+
+
+class GraphRandom(random.Random):
+    """
+    random.Random with the draws the generator needs.
+    """
+
+    def weights(self, count):
+        return [self.paretovariate(PARETO_ALPHA) for _ in range(count)]
+
+    def counts(self, weights, mean, limit):
+        # Integer counts following weights, averaging about mean
+        scale = mean * len(weights) / sum(weights)
+        return [
+            min(limit, int(weight * scale + self.random()))
+            for weight in weights
+        ]
+
+    def pick(self, cum_weights, count, exclude=None):
+        # count distinct indexes drawn in proportion to the weights
+        picked = set()
+        population = range(len(cum_weights))
+        while len(picked) < count:
+            for index in self.choices(
+                population, cum_weights=cum_weights, k=count - len(picked)
+            ):
+                if index != exclude:
+                    picked.add(index)
+        return picked
+
+    def text(self, mean_words):
+        length = max(1, int(self.expovariate(1 / mean_words)))
+        return ' '.join(self.choices(WORDS, k=length))
+
+
+def seed_social_graph(
+    users=1000, follows=20, posts=5, likes=10, comments=2, days=90,
+    seed=0, prefix='user', password='pass',
+):
+    """
+    Generate users named <prefix>0, <prefix>1, ... with their profiles,
+    follows, posts, likes and comments, averaging the given number of
+    follows and posts per user and likes and comments per post, and
+    return the number of rows created of each.
+    """
+    rng = GraphRandom(seed)
+    popularity = rng.weights(users)
+    activity = rng.weights(users)
+    by_popularity = list(accumulate(popularity))
+    by_activity = list(accumulate(activity))
+    now = timezone.now()
+
+    with transaction.atomic():
+        # One hash for everyone; hashing per user would dominate the run
+        hashed = make_password(password)
+        User.objects.bulk_create(
+            (
+                User(username=f'{prefix}{i}', password=hashed)
+                for i in range(users)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        # bulk_create leaves pk unset on SQLite, so users are read back
+        names = [f'{prefix}{i}' for i in range(users)]
+        new_users = User.objects.in_bulk(names, field_name='username')
+        user_ids = [new_users[name].pk for name in names]
+        Profile.objects.bulk_create(
+            (Profile(owner_id=pk) for pk in user_ids), batch_size=BATCH_SIZE
+        )
+
+        followed = {}
+        for user, count in enumerate(
+            rng.counts(activity, follows, users - 1)
+        ):
+            followed[user] = rng.pick(by_popularity, count, exclude=user)
+        Follower.objects.bulk_create(
+            (
+                Follower(owner_id=user_ids[user], followed_id=user_ids[other])
+                for user, others in followed.items() for other in others
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        # Posts are created oldest first, so ids follow created_at
+        planned = []
+        for user, count in enumerate(rng.counts(activity, posts, 10 * posts)):
+            planned.extend(
+                (now - timedelta(seconds=rng.uniform(0, days * 86400)), user)
+                for _ in range(count)
+            )
+        planned.sort()
+        first_new = (Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0) + 1
+        categories = Categories.values
+        new_posts = []
+        for created_at, user in planned:
+            content = rng.text(40)
+            new_posts.append(Post(
+                owner_id=user_ids[user], title=rng.text(6)[:255],
+                content=content, excerpt=make_excerpt(content),
+                category=rng.choice(categories),
+            ))
+        Post.objects.bulk_create(new_posts, batch_size=BATCH_SIZE)
+        # bulk_create sets created_at to now, so the posts are read back
+        # to give them their times
+        post_ids = list(Post.objects.filter(pk__gte=first_new).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+        Post.objects.bulk_update(
+            [
+                Post(pk=pk, created_at=created_at)
+                for pk, (created_at, user) in zip(post_ids, planned)
+            ],
+            ['created_at'], batch_size=BATCH_SIZE,
+        )
+
+        author_weights = [popularity[user] for created_at, user in planned]
+        new_likes, new_comments = [], []
+        for index, count in enumerate(
+            rng.counts(author_weights, likes, users)
+        ):
+            new_likes.extend(
+                Like(owner_id=user_ids[user], post_id=post_ids[index])
+                for user in rng.pick(by_activity, count)
+            )
+        for index, count in enumerate(
+            rng.counts(author_weights, comments, 10 * comments)
+        ):
+            new_comments.extend(
+                Comment(
+                    owner_id=user_ids[user], post_id=post_ids[index],
+                    content=rng.text(12),
+                )
+                for user in rng.choices(
+                    range(users), cum_weights=by_activity, k=count
+                )
+            )
+        Like.objects.bulk_create(new_likes, batch_size=BATCH_SIZE)
+        Comment.objects.bulk_create(new_comments, batch_size=BATCH_SIZE)
+
+        rebuild(user_ids, followed, planned, post_ids)
+
+    return {
+        'users': users,
+        'follows': sum(len(others) for others in followed.values()),
+        'posts': len(post_ids),
+        'likes': len(new_likes),
+        'comments': len(new_comments),
+    }
+
+
+def rebuild(user_ids, followed, planned, post_ids):
+    """
+    Bring what signals would have maintained in line with the new rows.
+    """
+    for command in [
+        'recount_posts', 'recount_profiles', 'rebuild_search_index'
+    ]:
+        call_command(command, stdout=StringIO())
+
+    # Fan-out-on-write timelines, newest FEED_BACKFILL_SIZE posts of each
+    # followed author who isn't over FEED_FANOUT_LIMIT
+    followers_count = defaultdict(int)
+    for others in followed.values():
+        for other in others:
+            followers_count[other] += 1
+    recent = defaultdict(list)
+    for pk, (created_at, user) in reversed(list(zip(post_ids, planned))):
+        if len(recent[user]) < settings.FEED_BACKFILL_SIZE:
+            recent[user].append((pk, created_at))
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                owner_id=user_ids[user], post_id=pk,
+                author_id=user_ids[other], created_at=created_at,
+            )
+            for user, others in followed.items() for other in others
+            if followers_count[other] <= settings.FEED_FANOUT_LIMIT
+            for pk, created_at in recent[other]
+        ),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    bump_tags('posts', 'profiles')
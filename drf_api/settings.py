@@ -24,10 +24,15 @@ CLOUDINARY_STORAGE = {
 }
 
 MEDIA_URL = '/media/'
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Set DEFAULT_FILE_STORAGE=django.core.files.storage.FileSystemStorage to
+# keep uploads in MEDIA_ROOT instead of Cloudinary, e.g. to work offline
+DEFAULT_FILE_STORAGE = os.environ.get(
+    'DEFAULT_FILE_STORAGE', 'cloudinary_storage.storage.MediaCloudinaryStorage'
+)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [(
@@ -46,6 +51,17 @@ if 'DEV' not in os.environ:
     ]
 
 
+# Authors with more followers than this aren't copied into each follower's
+# timeline when they post; their posts are merged into feeds on read.
+FEED_FANOUT_LIMIT = 1000
+# How many recent posts of a newly followed user are copied into the
+# follower's timeline.
+FEED_BACKFILL_SIZE = 50
+
+# Rows fetched per round trip by the streaming export at /export/.
+EXPORT_CHUNK_SIZE = 2000
+
+
 REST_USE_JWT = True
 JWT_AUTH_SECURE = True
 JWT_AUTH_COOKIE = 'my-app-auth'
@@ -102,10 +118,13 @@ INSTALLED_APPS = [
     'comments',
     'likes',
     'followers',
+    'feed',
 ]
 
 SITE_ID = 1
 MIDDLEWARE = [
+    # Removes itself unless INSTRUMENTATION_SAMPLE_RATE is set
+    'drf_api.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -168,6 +187,87 @@ else:
 
 
 
+# Caches
+# The 'responses' cache holds rendered responses for logged out users (see
+# drf_api/cache.py). Point RESPONSE_CACHE_BACKEND/RESPONSE_CACHE_LOCATION
+# at a Redis-compatible backend to share it between workers; without one
+# it is an LRU local-memory cache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+    },
+}
+if 'RESPONSE_CACHE_BACKEND' not in os.environ:
+    CACHES['responses']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 5000)),
+    }
+# A local-memory cache is per process, so a write would only invalidate
+# the worker that handled it; responses, and the post bodies cached for
+# logged in users too (see PostListSerializer), are only cached when the
+# responses cache is shared.
+RESPONSE_CACHE = 'RESPONSE_CACHE_BACKEND' in os.environ
+POST_BODY_CACHE = RESPONSE_CACHE
+
+
+# Image pipeline
+# Post and profile images are staged on local disk when uploaded, then
+# decoded, scaled down and saved to DEFAULT_FILE_STORAGE along with their
+# renditions by a pool of background threads (see drf_api/images.py).
+# With IMAGE_PIPELINE_WORKERS=0 they are processed in the request instead,
+# once its transaction commits.
+
+IMAGE_STAGING_ROOT = os.environ.get('IMAGE_STAGING_ROOT', BASE_DIR / 'staging')
+IMAGE_PIPELINE_WORKERS = int(os.environ.get('IMAGE_PIPELINE_WORKERS', 2))
+# Storage writes are retried this many times, waiting
+# IMAGE_PIPELINE_RETRY_DELAY seconds, then twice as long after each retry
+IMAGE_PIPELINE_RETRIES = 3
+IMAGE_PIPELINE_RETRY_DELAY = 1
+# Larger images are scaled down to fit within this many pixels
+IMAGE_MAX_DIMENSION = 4096
+# Uploads are refused, going by their header, beyond this many pixels
+IMAGE_MAX_UPLOAD_DIMENSION = 10000
+# Recompressed copies made of each image, by the size in pixels they fit
+IMAGE_RENDITIONS = {'thumb': 150, 'feed': 640, 'full': 1600}
+IMAGE_RENDITION_QUALITY = 80
+
+
+# Instrumentation
+# The share of requests, from 0 to 1, whose SQL, serialization and render
+# times are measured and reported in a Server-Timing header and a log
+# line (see drf_api/instrumentation.py). 0 turns the middleware off.
+
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0)
+)
+INSTRUMENTATION_SERVER_TIMING = True
+# Limits on queries, sql_ms, serialize_ms, render_ms or total_ms, keyed by
+# 'METHOD view' or by view. Going over one logs a warning, or raises
+# BudgetExceeded with 'raise'. The query counts include the session and
+# user lookups of a logged in request.
+INSTRUMENTATION_BUDGETS = {
+    'GET posts.views.PostList': {'queries': 5},
+    'GET posts.views.PostDetail': {'queries': 4},
+    'GET posts.views.PostPage': {'queries': 4},
+    'GET posts.views.CategoryView': {'queries': 4},
+    'GET comments.views.CommentList': {'queries': 4},
+    'GET comments.views.PostCommentThread': {'queries': 4},
+    'GET profiles.views.ProfileList': {'queries': 4},
+    'GET profiles.views.ProfileDetail': {'queries': 4},
+    'GET feed.views.FeedView': {'queries': 7},
+}
+INSTRUMENTATION_BUDGET_ACTION = os.environ.get(
+    'INSTRUMENTATION_BUDGET_ACTION', 'log'
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,152 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from comments.models import Comment
+from followers.models import Follower
+from likes.models import Like
+from posts.models import Post
+from .instrumentation import BudgetExceeded
+
+
+class ExportViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        for owner in [self.adam, brian]:
+            post = Post.objects.create(owner=owner, title='a title')
+            Comment.objects.create(owner=owner, post=post, content='hi')
+            Like.objects.create(owner=owner, post=post)
+        Post.objects.create(owner=self.adam, title='another title')
+        Follower.objects.create(owner=self.adam, followed=brian)
+        self.client.force_authenticate(self.adam)
+
+    def export(self, url='/export/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content)
+        return [json.loads(line) for line in content.splitlines()]
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_exports_only_the_users_rows_in_order(self):
+        lines = self.export()
+        self.assertEqual(
+            [line['type'] for line in lines],
+            ['post', 'post', 'comment', 'like', 'follow'],
+        )
+        self.assertEqual(lines[0]['title'], 'a title')
+        self.assertEqual(lines[-1]['cursor'], f"follow:{lines[-1]['id']}")
+
+    def test_resumes_after_the_cursor(self):
+        lines = self.export()
+        resumed = self.export(f"/export/?cursor={lines[1]['cursor']}")
+        self.assertEqual(resumed, lines[2:])
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ['post', 'poll:1', 'post:x']:
+            response = self.client.get(f'/export/?cursor={cursor}')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, cursor
+            )
+
+    def test_logged_out_users_cant_export(self):
+        self.client.force_authenticate(None)
+        response = self.client.get('/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        Like.objects.create(
+            owner=adam, post=Post.objects.create(owner=brian, title='a title')
+        )
+        Follower.objects.create(owner=adam, followed=brian)
+
+    def test_like_and_follower_lists_prune_their_joins(self):
+        for url, fields in [
+            ('/likes/', ['id', 'post']),
+            ('/followers/', ['id', 'followed']),
+        ]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"{url}?fields={','.join(fields)}")
+            self.assertEqual(list(response.data['results'][0]), fields)
+            self.assertNotIn(
+                'auth_user', ' '.join(query['sql'] for query in queries)
+            )
+
+    def test_writes_return_every_field(self):
+        self.client.login(username='brian', password='pass')
+        response = self.client.post(
+            '/posts/?fields=id', {'title': 'another title'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', response.data)
+
+
+@override_settings(
+    INSTRUMENTATION_SAMPLE_RATE=1, INSTRUMENTATION_BUDGETS={},
+    INSTRUMENTATION_BUDGET_ACTION='log',
+)
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        Post.objects.create(owner=self.adam, title='a title')
+
+    def test_sampled_requests_report_their_timings(self):
+        with self.assertLogs('drf_api.instrumentation', 'INFO') as logs:
+            response = self.client.get('/posts/')
+        timing = response['Server-Timing']
+        for name in ['sql', 'serialize', 'render', 'total']:
+            self.assertIn(f'{name};dur=', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts.views.PostList')
+        self.assertEqual(record['method'], 'GET')
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f"desc=\"{record['queries']} queries\"", timing)
+        self.assertGreater(record['serialize_ms'], 0)
+        self.assertGreater(record['render_ms'], 0)
+
+    def test_budgets_log_or_raise_when_exceeded(self):
+        # Logged in, so responses don't come from the response cache
+        self.client.force_authenticate(self.adam)
+        budgets = {'GET posts.views.PostList': {'queries': 0}}
+        with self.settings(INSTRUMENTATION_BUDGETS=budgets), self.assertLogs(
+            'drf_api.instrumentation', 'WARNING'
+        ) as logs:
+            self.client.get('/posts/')
+        self.assertIn('went over its budget', logs.output[-1])
+
+        with self.settings(
+            INSTRUMENTATION_BUDGETS=budgets,
+            INSTRUMENTATION_BUDGET_ACTION='raise',
+        ), self.assertRaises(BudgetExceeded):
+            self.client.get('/posts/')
+        # Other methods aren't held to a GET budget
+        with self.settings(
+            INSTRUMENTATION_BUDGETS=budgets,
+            INSTRUMENTATION_BUDGET_ACTION='raise',
+        ):
+            self.client.post('/posts/', {'title': 'a title'})
+
+    def test_streaming_responses_are_measured_until_they_close(self):
+        self.client.force_authenticate(self.adam)
+        with self.assertLogs('drf_api.instrumentation', 'INFO') as logs:
+            response = self.client.get('/export/')
+            self.assertEqual(logs.records, [])
+            # Logged once the body has been streamed
+            b''.join(response.streaming_content)
+        self.assertNotIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'drf_api.export.ExportView')
+        # The rows are read while the body streams
+        self.assertGreaterEqual(record['queries'], 4)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_middleware_is_off_without_a_sample_rate(self):
+        self.assertNotIn('Server-Timing', self.client.get('/posts/'))
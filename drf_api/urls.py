@@ -15,6 +15,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .export import ExportView
 from .views import root_route, logout_route
 
 urlpatterns = [
@@ -32,4 +33,6 @@ urlpatterns = [
     path('', include('comments.urls')),
     path('', include('likes.urls')),
     path('', include('followers.urls')),
+    path('', include('feed.urls')),
+    path('export/', ExportView.as_view()),
 ]
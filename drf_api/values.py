@@ -0,0 +1,157 @@
+"""
+Read-only serializers that build list items straight from .values() rows.
+
+A ModelSerializer loads a model instance for every row and then goes
+through get_attribute and to_representation for each field. A values
+serializer selects just the columns its list shows and builds each item
+with dict lookups, giving the same output as the ModelSerializer it stands
+in for. Views opt in through FastListMixin.
+
+With a sparse fieldset (see drf_api/fields.py), columns listed in
+field_columns are only selected when one of their fields is kept.
+"""
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+from .fields import serializer_field_names
+from .images import rendition_urls
+from .renderers import FastJSONRenderer
+
+
+class ValuesSerializer:
+    """
+    Base class for the values serializers. Subclasses list the columns
+    they select in columns and build an item from a row in
+    to_representation.
+    """
+    columns = ()
+    # Output fields mapped to the columns that only they read
+    field_columns = {}
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, instance=None, context=None, fields=None, **kwargs):
+        self.instance = instance
+        self.context = context or {}
+        self.request = self.context.get('request')
+        # The fields kept by a sparse fieldset, or None for all of them
+        self.fields = fields
+        # Rows mostly share a handful of default images
+        self.urls = {}
+
+    @classmethod
+    def selected_columns(cls, fields=None):
+        if fields is None:
+            return cls.columns
+        optional = set().union(*cls.field_columns.values())
+        needed = set().union(*(
+            cls.field_columns.get(name, ()) for name in fields
+        ))
+        return tuple(
+            column for column in cls.columns
+            if column not in optional or column in needed
+        )
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        return queryset.values(*cls.selected_columns(fields))
+
+    @property
+    def data(self):
+        return ReturnList(
+            [self.represent(row) for row in self.instance], serializer=self,
+        )
+
+    def represent(self, row):
+        if self.fields is None:
+            return self.to_representation(row)
+        # Columns left out of the query read as None, and the fields
+        # using them are dropped
+        ret = self.to_representation({**dict.fromkeys(self.columns), **row})
+        return {name: ret[name] for name in self.fields}
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    def is_owner(self, owner_id):
+        # Same as request.user == obj.owner
+        user = self.request.user
+        return user.is_authenticated and user.pk == owner_id
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value)
+
+    def file_url(self, field, name):
+        # FieldFile.url, for a file name read from the database
+        if name is None:
+            return None
+        if name not in self.urls:
+            self.urls[name] = field.storage.url(name)
+        return self.urls[name]
+
+    def image(self, field, name):
+        # serializers.ImageField.to_representation
+        if not name:
+            return None
+        url = self.file_url(field, name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def renditions(self, field, name, stored, url=None):
+        # ImagePipelineSerializerMixin.get_image_renditions, with url
+        # turning a stored name into a URL
+        url = url or self.image
+        return rendition_urls(
+            url(field, name), stored, lambda rendition: url(field, rendition)
+        )
+
+
+class FastListMixin:
+    """
+    Fast path for list views: GET lists are serialized by the view's
+    values_serializer_class, when it has one, and JSON is rendered with
+    FastJSONRenderer unless fast_json is turned off.
+    """
+    values_serializer_class = None
+    fast_json = True
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not self.fast_json:
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def get_values_serializer_class(self):
+        return self.values_serializer_class
+
+    def uses_values_serializer(self):
+        return (
+            self.request.method == 'GET'
+            and self.get_values_serializer_class() is not None
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.uses_values_serializer():
+            queryset = self.get_values_serializer_class().values(
+                queryset, self.sparse_fields()
+            )
+        return queryset
+
+    def sparse_fields(self):
+        # None unless the request trims the fields
+        fields = self.selected_fields()
+        if len(fields) == len(serializer_field_names(self.get_serializer_class())):
+            return None
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and self.uses_values_serializer():
+            return self.get_values_serializer_class()(
+                *args, context=self.get_serializer_context(),
+                fields=self.sparse_fields(),
+            )
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_timelines(apps, schema_editor):
+    # Give every existing follow the same backfill a new follow gets
+    Follower = apps.get_model('followers', 'Follower')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('feed', 'TimelineEntry')
+
+    follows = Follower.objects.exclude(
+        followed__profile__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('owner_id', 'followed_id')
+    for owner_id, followed_id in follows.iterator():
+        posts = Post.objects.filter(owner_id=followed_id).order_by(
+            '-created_at'
+        ).values_list('pk', 'created_at')[:settings.FEED_BACKFILL_SIZE]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    owner_id=owner_id, post_id=pk,
+                    author_id=followed_id, created_at=created_at,
+                )
+                for pk, created_at in posts
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0001_initial'),
+        ('followers', '0003_composite_indexes'),
+        ('profiles', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.db import models
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from followers.models import Follower, follows_created, follows_deleted
+from posts.models import Post
+from profiles.models import Profile
+
+
+class TimelineEntry(models.Model):
+    """
+    TimelineEntry model, a materialized row of a user's home feed.
+    'owner' is the User whose feed it is, 'post' a Post by 'author', a
+    User 'owner' follows. 'created_at' copies the post's creation time, so
+    a page of the feed is one range scan of the (owner, created_at, post)
+    index.
+    """
+    owner = models.ForeignKey(
+        User, related_name='timeline_entries', on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post, related_name='timeline_entries', on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User, related_name='+', on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-post']
+        unique_together = ['owner', 'post']
+        indexes = [
+            models.Index(
+                fields=['owner', '-created_at', '-post'],
+                name='timeline_owner_created_idx',
+            ),
+            # Serves pruning a feed when its owner unfollows an author
+            models.Index(
+                fields=['owner', 'author'], name='timeline_owner_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.owner} {self.post}'
+
+
+def fans_out_on_write(user_id):
+    # Authors with more followers than FEED_FANOUT_LIMIT are merged into
+    # feeds when they are read instead of being copied into every timeline
+    return not Profile.objects.filter(
+        owner_id=user_id, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out_post(sender, instance, created, **kwargs):
+    if not created or not fans_out_on_write(instance.owner_id):
+        return
+    followers = Follower.objects.filter(
+        followed_id=instance.owner_id
+    ).values_list('owner_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                owner_id=follower, post_id=instance.pk,
+                author_id=instance.owner_id, created_at=instance.created_at,
+            )
+            for follower in followers.iterator()
+        ),
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+def backfill_timeline(sender, instance, created, **kwargs):
+    if not created or not fans_out_on_write(instance.followed_id):
+        return
+    posts = Post.objects.filter(
+        owner_id=instance.followed_id
+    ).order_by('-created_at').values_list('pk', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=instance.owner_id, post_id=pk,
+                author_id=instance.followed_id, created_at=created_at,
+            )
+            for pk, created_at in posts[:settings.FEED_BACKFILL_SIZE]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def prune_timeline(sender, instance, **kwargs):
+    TimelineEntry.objects.filter(
+        owner_id=instance.owner_id, author_id=instance.followed_id
+    ).delete()
+
+
+def crossed_under_fanout_limit(author_ids):
+    """
+    The authors among author_ids, who just lost a follower each, that went
+    from over FEED_FANOUT_LIMIT followers to at it.
+    """
+    limit = settings.FEED_FANOUT_LIMIT
+    # The stored counter may or may not have been decremented yet, so the
+    # follows of authors near the limit are counted
+    near = Profile.objects.filter(
+        owner_id__in=author_ids, followers_count__in=[limit, limit + 1]
+    ).values_list('owner_id', flat=True)
+    return [
+        author for author in near
+        if Follower.objects.filter(followed_id=author).count() == limit
+    ]
+
+
+def backfill_followers(author_ids):
+    # Posts written while an author was over the fan-out limit were only
+    # merged in when feeds were read, which stops once they are back
+    # under it, so their recent posts are copied into every timeline
+    for author in crossed_under_fanout_limit(author_ids):
+        posts = list(Post.objects.filter(
+            owner_id=author
+        ).order_by('-created_at').values_list('pk', 'created_at')[
+            :settings.FEED_BACKFILL_SIZE
+        ])
+        followers = Follower.objects.filter(
+            followed_id=author
+        ).values_list('owner_id', flat=True)
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    owner_id=follower, post_id=pk,
+                    author_id=author, created_at=created_at,
+                )
+                for follower in followers.iterator()
+                for pk, created_at in posts
+            ),
+            batch_size=500, ignore_conflicts=True,
+        )
+
+
+def backfill_after_unfollow(sender, instance, **kwargs):
+    backfill_followers([instance.followed_id])
+
+
+def backfill_after_unfollows(sender, followed_ids, **kwargs):
+    # Bulk unfollow version of backfill_after_unfollow
+    backfill_followers(followed_ids)
+
+
+def backfill_timelines(sender, owner_id, followed_ids, **kwargs):
+    # Bulk follow version of backfill_timeline
+    fanned_out_on_read = set(Profile.objects.filter(
+        owner_id__in=followed_ids,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values_list('owner_id', flat=True))
+    entries = []
+    for author in set(followed_ids) - fanned_out_on_read:
+        posts = Post.objects.filter(
+            owner_id=author
+        ).order_by('-created_at').values_list('pk', 'created_at')
+        entries.extend(
+            TimelineEntry(
+                owner_id=owner_id, post_id=pk,
+                author_id=author, created_at=created_at,
+            )
+            for pk, created_at in posts[:settings.FEED_BACKFILL_SIZE]
+        )
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=500, ignore_conflicts=True
+    )
+
+
+def prune_timelines(sender, owner_id, followed_ids, **kwargs):
+    # Bulk unfollow version of prune_timeline
+    TimelineEntry.objects.filter(
+        owner_id=owner_id, author_id__in=followed_ids
+    ).delete()
+
+
+post_save.connect(fan_out_post, sender=Post)
+post_save.connect(backfill_timeline, sender=Follower)
+post_delete.connect(prune_timeline, sender=Follower)
+post_delete.connect(backfill_after_unfollow, sender=Follower)
+follows_created.connect(backfill_timelines, sender=Follower)
+follows_deleted.connect(prune_timelines, sender=Follower)
+follows_deleted.connect(backfill_after_unfollows, sender=Follower)
@@ -0,0 +1,98 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import override_settings
+from followers.models import Follower, unfollow_users
+from posts.models import Post, PostQuerySet
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import TimelineEntry
+
+
+class FeedViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        self.carl = User.objects.create_user(username='carl', password='pass')
+        self.client.login(username='adam', password='pass')
+
+    def feed_titles(self):
+        response = self.client.get('/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_logged_out_user_cant_read_a_feed(self):
+        self.client.logout()
+        response = self.client.get('/feed/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_new_posts_fan_out_to_followers(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        Post.objects.create(owner=self.brian, title='brians post')
+        Post.objects.create(owner=self.carl, title='carls post')
+        self.assertEqual(self.feed_titles(), ['brians post'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Post.objects.create(owner=self.brian, title='older post')
+        follow = Follower.objects.create(owner=self.adam, followed=self.brian)
+        self.assertEqual(self.feed_titles(), ['older post'])
+
+        follow.delete()
+        self.assertEqual(self.feed_titles(), [])
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.adam).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_authors_are_merged_on_read(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        Follower.objects.create(owner=self.adam, followed=self.carl)
+        for i in range(3):
+            Post.objects.create(owner=self.brian, title=f'brian {i}')
+            Post.objects.create(owner=self.carl, title=f'carl {i}')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), [
+            'carl 2', 'brian 2', 'carl 1', 'brian 1', 'carl 0', 'brian 0',
+        ])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_posts_written_over_the_limit_stay_after_dropping_under_it(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        follow = Follower.objects.create(owner=self.carl, followed=self.brian)
+        Post.objects.create(owner=self.brian, title='popular post')
+        self.assertFalse(TimelineEntry.objects.exists())
+
+        follow.delete()
+        self.assertEqual(self.feed_titles(), ['popular post'])
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.adam).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_bulk_unfollows_back_under_the_limit_backfill(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        Follower.objects.create(owner=self.carl, followed=self.brian)
+        Post.objects.create(owner=self.brian, title='popular post')
+        unfollow_users(self.carl, [self.brian.pk])
+        self.assertEqual(self.feed_titles(), ['popular post'])
+
+    def test_feed_pages_follow_the_cursor(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        for i in range(15):
+            Post.objects.create(owner=self.brian, title=f'post {i}')
+        first = self.client.get('/feed/').data
+        second = self.client.get(first['next']).data
+        titles = [
+            post['title'] for post in first['results'] + second['results']
+        ]
+        self.assertEqual(titles, [f'post {i}' for i in reversed(range(15))])
+        self.assertIsNone(second['next'])
+
+    def test_next_cursor_survives_a_page_deleted_while_read(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        for i in range(15):
+            Post.objects.create(owner=self.brian, title=f'post {i}')
+        # Every post of the page is gone by the time the page is loaded
+        with mock.patch.object(PostQuerySet, 'in_bulk', return_value={}):
+            first = self.client.get('/feed/').data
+        self.assertEqual(first['results'], [])
+        second = self.client.get(first['next']).data
+        self.assertEqual(
+            [post['title'] for post in second['results']],
+            [f'post {i}' for i in reversed(range(5))],
+        )
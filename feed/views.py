@@ -0,0 +1,105 @@
+# Importing necessary Django REST framework classes and local modules
+import heapq
+from itertools import islice
+from django.conf import settings
+from rest_framework import generics, permissions
+from rest_framework.utils.urls import replace_query_param
+from drf_api.conditional import ConditionalListMixin
+from drf_api.mixins import SelectRelatedMixin
+from drf_api.pagination import KeysetPagination, after_position
+from drf_api.values import FastListMixin
+from followers.models import Follower
+from posts.models import Post
+from posts.serializers import PostSerializer
+from .models import TimelineEntry
+
+
+def timeline_positions(user, position, limit):
+    # Fan-out-on-write part of the feed: one range scan of the user's
+    # materialized timeline
+    entries = TimelineEntry.objects.filter(owner=user)
+    if position is not None:
+        entries = after_position(entries, position, id_field='post_id')
+    return entries.order_by('-created_at', '-post_id').values_list(
+        'created_at', 'post_id'
+    )[:limit]
+
+
+def fan_out_on_read_positions(user, position, limit):
+    # Fan-out-on-read part of the feed: recent posts of followed authors
+    # too popular to be copied into every follower's timeline
+    authors = list(Follower.objects.filter(
+        owner=user,
+        followed__profile__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values_list('followed_id', flat=True))
+    if not authors:
+        return []
+    posts = Post.objects.filter(owner__in=authors)
+    if position is not None:
+        posts = after_position(posts, position)
+    return posts.order_by('-created_at', '-id').values_list(
+        'created_at', 'id'
+    )[:limit]
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Keyset pagination over the two halves of a user's home feed, merged
+    on (created_at, id) before the page of posts is loaded by id.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+        position = self.decode_cursor(request)
+        limit = self.page_size + 1
+
+        merged = heapq.merge(
+            timeline_positions(request.user, position, limit),
+            fan_out_on_read_positions(request.user, position, limit),
+            reverse=True,
+        )
+        # An author who crossed the fan-out limit can have posts in both
+        # halves; the merge puts those duplicates next to each other
+        positions = []
+        for entry in merged:
+            if not positions or positions[-1] != entry:
+                positions.append(entry)
+        positions = list(islice(positions, limit))
+
+        self.has_next = len(positions) > self.page_size
+        positions = positions[:self.page_size]
+        posts = queryset.in_bulk([pk for created_at, pk in positions])
+        self.page = [posts[pk] for created_at, pk in positions if pk in posts]
+        # Posts deleted since their positions were read leave no row, so
+        # the next page starts after the last position, not the last post
+        self.last_position = positions[-1] if positions else None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        created_at, pk = self.last_position
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor({'created_at': created_at, 'id': pk}),
+        )
+
+
+class FeedView(FastListMixin, ConditionalListMixin, SelectRelatedMixin, generics.ListAPIView):
+    """
+    List the posts of the users the logged in user follows, newest first.
+    Replaces PostList?owner__followed__owner__profile= for the home feed.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimelinePagination
+    queryset = Post.objects.all()
+    etag_fields = ('likes_count', 'comments_count', 'like_id')
+    etag_annotations = {'profile_updated_at': 'owner__profile__updated_at'}
+
+    def get_queryset(self):
+        queryset = super().get_queryset().page_keys_only()
+        if self.wants('like_id'):
+            queryset = queryset.with_like_id(self.request.user)
+        return queryset
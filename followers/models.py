@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
+from django.db.models.signals import Signal, post_delete, post_save
+from drf_api.cache import bump_tags
 
 
 class Follower(models.Model):
@@ -22,6 +24,110 @@ class Follower(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['owner', 'followed']
+        indexes = [
+            # Serves keyset pagination on (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'], name='follower_keyset_idx'
+            ),
+            # (owner, followed) is covered by unique_together; this serves
+            # the reverse "who follows this user" lookups, newest first
+            models.Index(
+                fields=['followed', '-created_at'],
+                name='follower_followed_created_idx',
+            ),
+        ]
 
     def __str__(self):
-        return f'{self.owner} {self.followed}'
\ No newline at end of file
+        return f'{self.owner} {self.followed}'
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Follows change both users' profile counters and the followed-feed
+    # filter of PostList
+    bump_tags(
+        'posts', 'profiles',
+        f'user:{instance.owner_id}', f'user:{instance.followed_id}',
+    )
+
+
+post_save.connect(invalidate_cached_responses, sender=Follower)
+post_delete.connect(invalidate_cached_responses, sender=Follower)
+
+
+# Sent once per bulk follow or unfollow with the owner_id and the
+# followed_ids actually written, as bulk_create and delete_follows don't
+# send post_save or post_delete for each row. Receivers do the set-based
+# version of their per-row handlers.
+follows_created = Signal()
+follows_deleted = Signal()
+
+
+def delete_follows(owner_id, followed_ids):
+    """
+    Delete owner_id's follows of followed_ids with one plain DELETE,
+    sending no post_delete signals; callers send follows_deleted for the
+    set instead. Nothing references follows, so no rows cascade.
+    """
+    if not followed_ids:
+        return
+    table = connection.ops.quote_name(Follower._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(followed_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE owner_id = %s '
+            f'AND followed_id IN ({placeholders})',
+            [owner_id, *followed_ids],
+        )
+
+
+def follow_users(owner, user_ids):
+    """
+    Follow every user in user_ids as owner with a single INSERT that skips
+    users already followed. Returns {user id: follower id} for the users
+    that exist, and the user ids that were newly followed.
+    """
+    with transaction.atomic():
+        user_ids = set(User.objects.filter(pk__in=user_ids).exclude(
+            pk=owner.pk
+        ).values_list('pk', flat=True))
+        follows = Follower.objects.filter(owner=owner, followed__in=user_ids)
+        followed = set(follows.values_list('followed_id', flat=True))
+        # ignore_conflicts turns the unique_together violation of a follow
+        # racing in from another request into a no-op
+        Follower.objects.bulk_create(
+            [Follower(owner=owner, followed_id=pk) for pk in user_ids - followed],
+            ignore_conflicts=True,
+        )
+        follow_ids = dict(follows.values_list('followed_id', 'pk'))
+        created = set(follow_ids) - followed
+        if created:
+            follows_created.send(
+                sender=Follower, owner_id=owner.pk, followed_ids=created
+            )
+    if created:
+        bump_tags(
+            'posts', 'profiles', f'user:{owner.pk}',
+            *(f'user:{pk}' for pk in created),
+        )
+    return follow_ids, created
+
+
+def unfollow_users(owner, user_ids):
+    """
+    Remove owner's follows of the users in user_ids with a single DELETE.
+    Returns the user ids that were unfollowed.
+    """
+    with transaction.atomic():
+        follows = Follower.objects.filter(owner=owner, followed__in=user_ids)
+        unfollowed = set(follows.values_list('followed_id', flat=True))
+        if unfollowed:
+            delete_follows(owner.pk, sorted(unfollowed))
+            follows_deleted.send(
+                sender=Follower, owner_id=owner.pk, followed_ids=unfollowed
+            )
+    if unfollowed:
+        bump_tags(
+            'posts', 'profiles', f'user:{owner.pk}',
+            *(f'user:{pk}' for pk in unfollowed),
+        )
+    return unfollowed
@@ -1,10 +1,11 @@
 # Importing necessary modules from Django and Django REST framework
 from django.db import IntegrityError
 from rest_framework import serializers
+from drf_api.fields import SparseFieldsMixin
 from .models import Follower
 
 # Definition of the FollowerSerializer class
-class FollowerSerializer(serializers.ModelSerializer):
+class FollowerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Follower model
     Create method handles the unique constraint on 'owner' and 'followed'
@@ -34,3 +35,50 @@ class FollowerSerializer(serializers.ModelSerializer):
             # (i.e., the same user trying to follow the same person more than once).
             # Raising a ValidationError with a custom message indicating a possible duplicate follow attempt.
             raise serializers.ValidationError({'detail': 'possible duplicate'})
+
+
+# The most user ids a bulk follow list or a following lookup takes
+MAX_USERS = 100
+
+
+def user_id_list():
+    return serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, default=list, max_length=MAX_USERS,
+    )
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """
+    Serializer for a batch of follows and unfollows, e.g. from a
+    "suggested users" screen. Each list takes up to MAX_USERS user ids.
+    """
+    follow = user_id_list()
+    unfollow = user_id_list()
+
+    def validate(self, data):
+        if set(data['follow']) & set(data['unfollow']):
+            raise serializers.ValidationError(
+                'A user cannot be followed and unfollowed in the same request.'
+            )
+        return data
+
+
+class FollowingLookupSerializer(serializers.Serializer):
+    """
+    Serializer for the ?users=1,2,3 query of the following lookup.
+    """
+    users = serializers.CharField()
+
+    def validate_users(self, value):
+        try:
+            users = [int(pk) for pk in value.split(',') if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError(
+                'Expected a comma separated list of user ids.'
+            )
+        if len(users) > MAX_USERS:
+            raise serializers.ValidationError(
+                f'Ensure this list has no more than {MAX_USERS} user ids.'
+            )
+        return users
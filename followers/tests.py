@@ -1,3 +1,102 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from feed.models import TimelineEntry
+from posts.models import Post
+from .models import Follower
 
-# Create your tests here.
+
+class FollowerListViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/followers/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        brian = User.objects.create_user(username='brian', password='pass')
+        Follower.objects.create(owner=brian, followed=self.adam)
+        one_follow = self.count_queries()
+        for i in range(5):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            Follower.objects.create(owner=user, followed=self.adam)
+        self.assertEqual(self.count_queries(), one_follow)
+
+
+class BulkFollowViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.others = [
+            User.objects.create_user(username=f'user{i}', password='pass')
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.adam)
+
+    def follow(self, **data):
+        response = self.client.post('/followers/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['status'] for result in response.data['results']]
+
+    def test_follows_many_users_and_keeps_counts(self):
+        first, second, third = self.others
+        Follower.objects.create(owner=self.adam, followed=first)
+        self.assertEqual(
+            self.follow(follow=[first.id, second.id, self.adam.id, 999]),
+            ['exists', 'created', 'not_found', 'not_found'],
+        )
+        self.adam.profile.refresh_from_db()
+        second.profile.refresh_from_db()
+        self.assertEqual(self.adam.profile.following_count, 2)
+        self.assertEqual(second.profile.followers_count, 1)
+
+        self.assertEqual(
+            self.follow(unfollow=[first.id, third.id]),
+            ['deleted', 'not_following'],
+        )
+        self.adam.profile.refresh_from_db()
+        first.profile.refresh_from_db()
+        self.assertEqual(self.adam.profile.following_count, 1)
+        self.assertEqual(first.profile.followers_count, 0)
+
+    def test_bulk_follows_fill_and_prune_the_feed(self):
+        post = Post.objects.create(owner=self.others[0], title='a title')
+        self.follow(follow=[self.others[0].id])
+        self.assertTrue(
+            TimelineEntry.objects.filter(owner=self.adam, post=post).exists()
+        )
+        self.follow(unfollow=[self.others[0].id])
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.adam).exists())
+
+    def test_unfollow_query_count_does_not_grow_with_the_users(self):
+        def unfollow_all():
+            users = list(User.objects.exclude(pk=self.adam.pk))
+            self.follow(follow=[user.id for user in users])
+            with CaptureQueriesContext(connection) as context:
+                self.follow(unfollow=[user.id for user in users])
+            self.assertFalse(Follower.objects.exists())
+            return len(context.captured_queries)
+
+        few = unfollow_all()
+        for i in range(3, 50):
+            User.objects.create_user(username=f'user{i}', password='pass')
+        self.assertEqual(unfollow_all(), few)
+
+    def test_lookup_reports_follow_ids_from_one_query(self):
+        follow = Follower.objects.create(owner=self.adam, followed=self.others[0])
+        ids = ','.join(str(user.id) for user in self.others)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/followers/lookup/?users={ids}')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(
+            [result['following_id'] for result in response.data['results']],
+            [follow.id, None, None],
+        )
+
+    def test_lookup_rejects_bad_ids(self):
+        response = self.client.get('/followers/lookup/?users=1,x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,5 +3,7 @@ from followers import views
 
 urlpatterns = [
     path('followers/', views.FollowerList.as_view()),
-    path('followers/<int:pk>/', views.FollowerDetail.as_view())
-]
\ No newline at end of file
+    path('followers/<int:pk>/', views.FollowerDetail.as_view()),
+    path('followers/bulk/', views.BulkFollowView.as_view()),
+    path('followers/lookup/', views.FollowingLookup.as_view()),
+]
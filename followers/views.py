@@ -1,11 +1,16 @@
 # Importing necessary modules and classes from Django REST framework and custom permissions
 from rest_framework import generics, permissions
+from rest_framework.response import Response
+from drf_api.mixins import SelectRelatedMixin
+from drf_api.pagination import FeedPagination
 from drf_api.permissions import IsOwnerOrReadOnly
-from .models import Follower
-from .serializers import FollowerSerializer
+from .models import Follower, follow_users, unfollow_users
+from .serializers import (
+    BulkFollowSerializer, FollowerSerializer, FollowingLookupSerializer
+)
 
 # FollowerList class for handling listing and creating followers
-class FollowerList(generics.ListCreateAPIView):
+class FollowerList(SelectRelatedMixin, generics.ListCreateAPIView):
     """
     List all followers, i.e. all instances of a user
     following another user.
@@ -14,6 +19,7 @@ class FollowerList(generics.ListCreateAPIView):
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # Permissions - allow any read actions but restrict write actions to authenticated users
     queryset = Follower.objects.all()  # The queryset representing the database query to be executed for followers
+    pagination_class = FeedPagination  # Page numbers by default, keyset with ?pagination=keyset
     serializer_class = FollowerSerializer  # Specifies the serializer to use for request/response data formatting
 
     def perform_create(self, serializer):
@@ -24,7 +30,7 @@ class FollowerList(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)  # Save the follower instance with the owner field set to the currently authenticated user
 
 # FollowerDetail class for handling individual follower retrieval and deletion
-class FollowerDetail(generics.RetrieveDestroyAPIView):
+class FollowerDetail(SelectRelatedMixin, generics.RetrieveDestroyAPIView):
     """
     Retrieve a follower.
     No Update view, as we either follow or unfollow users.
@@ -33,3 +39,64 @@ class FollowerDetail(generics.RetrieveDestroyAPIView):
     permission_classes = [IsOwnerOrReadOnly]  # Custom permission - allows operations only if the user is the owner of the follower
     queryset = Follower.objects.all()  # The queryset for retrieving the follower from the database
     serializer_class = FollowerSerializer  # Specifies the serializer for follower data
+
+# FollowingLookup class for checking which of many users the viewer follows
+class FollowingLookup(generics.GenericAPIView):
+    """
+    Tell which of the users in ?users=1,2,3 the logged in user follows.
+    Answers with the user's follower id for each user, or null, from one
+    lookup on the (owner, followed) unique index.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    serializer_class = FollowingLookupSerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        users = serializer.validated_data['users']
+
+        following = {}
+        if request.user.is_authenticated and users:
+            following = dict(Follower.objects.filter(
+                owner=request.user, followed__in=users
+            ).values_list('followed_id', 'pk'))
+        return Response({'results': [
+            {'user': pk, 'following_id': following.get(pk)} for pk in users
+        ]})
+
+# BulkFollowView class for following and unfollowing many users in one request
+class BulkFollowView(generics.GenericAPIView):
+    """
+    Follow and unfollow many users at once if logged in.
+    Takes {"follow": [user ids], "unfollow": [user ids]} and answers with
+    the outcome for each user id, in the order they were sent:
+    "created", "exists" or "not_found" (no such user, or yourself) for
+    follows, and "deleted" or "not_following" for unfollows.
+    """
+    permission_classes = [permissions.IsAuthenticated]  # Only logged in users can follow
+    serializer_class = BulkFollowSerializer  # Validates the lists of user ids
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        follow, unfollow = serializer.validated_data['follow'], serializer.validated_data['unfollow']
+
+        follow_ids, created = follow_users(request.user, follow) if follow else ({}, set())
+        unfollowed = unfollow_users(request.user, unfollow) if unfollow else set()
+
+        results = []
+        for pk in follow:
+            if pk not in follow_ids:
+                results.append({'user': pk, 'status': 'not_found'})
+            else:
+                results.append({
+                    'user': pk,
+                    'status': 'created' if pk in created else 'exists',
+                    'following_id': follow_ids[pk],
+                })
+        for pk in unfollow:
+            results.append({
+                'user': pk,
+                'status': 'deleted' if pk in unfollowed else 'not_following',
+            })
+        return Response({'results': results})
@@ -1,6 +1,9 @@
 # Importing the necessary Django modules to define a model
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from drf_api.cache import bump_tags
 from posts.models import Post
 
 # Definition of the Like model
@@ -29,8 +32,116 @@ class Like(models.Model):
     class Meta:
         ordering = ['-created_at']  # Default ordering of likes - newest first
         unique_together = ['owner', 'post']  # Ensures that a user can like a post only once
+        indexes = [
+            # Serves keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='like_keyset_idx'),
+            # (owner, post) is covered by unique_together; this serves the
+            # reverse lookups of a post's likes, newest first
+            models.Index(fields=['post', '-created_at'], name='like_post_created_idx'),
+        ]
 
     # __str__ method to define the string representation of a Like object
     def __str__(self):
         # Returns a string that includes the username of the owner and the title of the post
         return f'{self.owner} {self.post}'
+
+
+# Keep Post.likes_count in step with the likes table. The F() expressions
+# make each update atomic in the database, so concurrent likes can't race.
+def increment_likes_count(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            likes_count=models.F('likes_count') + 1
+        )
+
+
+def decrement_likes_count(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, likes_count__gt=0).update(
+        likes_count=models.F('likes_count') - 1
+    )
+
+
+post_save.connect(increment_likes_count, sender=Like)
+post_delete.connect(decrement_likes_count, sender=Like)
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Likes change the likes_count of their post
+    bump_tags('posts', f'post:{instance.post_id}')
+
+
+post_save.connect(invalidate_cached_responses, sender=Like)
+post_delete.connect(invalidate_cached_responses, sender=Like)
+
+
+def recount_likes(post_ids):
+    # Set likes_count of the posts straight from the likes table, for the
+    # bulk paths that skip the per-row signal handlers above
+    Post.objects.filter(pk__in=post_ids).update(likes_count=Coalesce(
+        models.Subquery(
+            Like.objects.filter(post=models.OuterRef('pk')).order_by()
+            .values('post').annotate(total=models.Count('pk')).values('total')
+        ),
+        models.Value(0),
+    ))
+
+
+def delete_likes(owner_id, post_ids):
+    """
+    Delete owner_id's likes of post_ids with one plain DELETE, sending no
+    post_delete signals; the bulk path recounts and invalidates for the
+    whole set instead. Nothing references likes, so no rows cascade.
+    """
+    if not post_ids:
+        return
+    table = connection.ops.quote_name(Like._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE owner_id = %s '
+            f'AND post_id IN ({placeholders})',
+            [owner_id, *post_ids],
+        )
+
+
+def like_posts(owner, post_ids):
+    """
+    Like every post in post_ids as owner with a single INSERT that skips
+    posts already liked. Returns {post id: like id} for the posts that
+    exist, and the post ids that were newly liked.
+    """
+    with transaction.atomic():
+        post_ids = set(Post.objects.filter(pk__in=post_ids).values_list(
+            'pk', flat=True
+        ))
+        likes = Like.objects.filter(owner=owner, post__in=post_ids)
+        liked = set(likes.values_list('post_id', flat=True))
+        # ignore_conflicts turns the unique_together violation of a like
+        # racing in from another request into a no-op
+        Like.objects.bulk_create(
+            [Like(owner=owner, post_id=pk) for pk in post_ids - liked],
+            ignore_conflicts=True,
+        )
+        like_ids = dict(likes.values_list('post_id', 'pk'))
+        created = set(like_ids) - liked
+        if created:
+            recount_likes(created)
+    if created:
+        bump_tags('posts', *(f'post:{pk}' for pk in created))
+    return like_ids, created
+
+
+def unlike_posts(owner, post_ids):
+    """
+    Remove owner's likes of the posts in post_ids with a single DELETE.
+    Returns the post ids that were unliked.
+    """
+    with transaction.atomic():
+        likes = Like.objects.filter(owner=owner, post__in=post_ids)
+        unliked = set(likes.values_list('post_id', flat=True))
+        if unliked:
+            delete_likes(owner.pk, sorted(unliked))
+            recount_likes(unliked)
+    if unliked:
+        bump_tags('posts', *(f'post:{pk}' for pk in unliked))
+    return unliked
@@ -1,10 +1,11 @@
 # Importing necessary Django and Django REST framework modules
 from django.db import IntegrityError
 from rest_framework import serializers
+from drf_api.fields import SparseFieldsMixin
 from likes.models import Like
 
 # LikeSerializer class definition
-class LikeSerializer(serializers.ModelSerializer):
+class LikeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Like model
     The create method handles the unique constraint on 'owner' and 'post'
@@ -30,3 +31,27 @@ class LikeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'detail': 'possible duplicate'
             })
+
+
+class BulkLikeSerializer(serializers.Serializer):
+    """
+    Serializer for a batch of likes and unlikes, e.g. ones made offline
+    and replayed by a client. Each list takes up to MAX_POSTS post ids.
+    """
+    MAX_POSTS = 100
+
+    like = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, default=list, max_length=MAX_POSTS,
+    )
+    unlike = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, default=list, max_length=MAX_POSTS,
+    )
+
+    def validate(self, data):
+        if set(data['like']) & set(data['unlike']):
+            raise serializers.ValidationError(
+                'A post cannot be liked and unliked in the same request.'
+            )
+        return data
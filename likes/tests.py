@@ -1,3 +1,125 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from posts.models import Post
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import Like
 
-# Create your tests here.
+
+class LikeListViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/likes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        Like.objects.create(owner=self.adam, post=self.post)
+        one_like = self.count_queries()
+        for i in range(5):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            Like.objects.create(owner=user, post=self.post)
+        self.assertEqual(self.count_queries(), one_like)
+
+
+class BulkLikeViewTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.posts = [
+            Post.objects.create(owner=self.adam, title=f'title {i}')
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.adam)
+
+    def test_likes_many_posts_and_reports_each_one(self):
+        first, second, third = self.posts
+        existing = Like.objects.create(owner=self.adam, post=first)
+        response = self.client.post('/likes/bulk/', {
+            'like': [first.id, second.id, third.id, 999],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['exists', 'created', 'created', 'not_found'],
+        )
+        self.assertEqual(results[0]['like_id'], existing.id)
+        self.assertEqual(Like.objects.filter(owner=self.adam).count(), 3)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('likes_count', flat=True)),
+            [1, 1, 1],
+        )
+
+    def test_inserts_all_new_likes_in_one_query(self):
+        ids = [post.id for post in self.posts]
+        with CaptureQueriesContext(connection) as context:
+            self.client.post('/likes/bulk/', {'like': ids}, format='json')
+        inserts = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+    def test_unlikes_and_updates_counts(self):
+        first, second, _ = self.posts
+        Like.objects.create(owner=self.adam, post=first)
+        response = self.client.post('/likes/bulk/', {
+            'unlike': [first.id, second.id],
+        }, format='json')
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['deleted', 'not_liked'],
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.likes_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_unlike_query_count_does_not_grow_with_the_posts(self):
+        def unlike_all():
+            posts = list(Post.objects.all())
+            Like.objects.bulk_create(
+                Like(owner=self.adam, post=post) for post in posts
+            )
+            with CaptureQueriesContext(connection) as context:
+                self.client.post('/likes/bulk/', {
+                    'unlike': [post.id for post in posts],
+                }, format='json')
+            self.assertFalse(Like.objects.exists())
+            return len(context.captured_queries)
+
+        few = unlike_all()
+        for i in range(47):
+            Post.objects.create(owner=self.adam, title=f'more {i}')
+        self.assertEqual(unlike_all(), few)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_bulk_likes_invalidate_cached_posts(self):
+        self.client.force_authenticate(None)
+        self.client.get('/posts/')
+        self.client.force_authenticate(self.adam)
+        self.client.post(
+            '/likes/bulk/', {'like': [self.posts[0].id]}, format='json'
+        )
+        self.client.force_authenticate(None)
+        response = self.client.get('/posts/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_cannot_like_and_unlike_the_same_post(self):
+        pk = self.posts[0].id
+        response = self.client.post(
+            '/likes/bulk/', {'like': [pk], 'unlike': [pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logged_out_users_cant_bulk_like(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            '/likes/bulk/', {'like': [self.posts[0].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
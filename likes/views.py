@@ -1,11 +1,14 @@
 # Importing necessary Django REST framework classes and custom permissions
 from rest_framework import generics, permissions
+from rest_framework.response import Response
+from drf_api.mixins import SelectRelatedMixin
+from drf_api.pagination import FeedPagination
 from drf_api.permissions import IsOwnerOrReadOnly
-from likes.models import Like
-from likes.serializers import LikeSerializer
+from likes.models import Like, like_posts, unlike_posts
+from likes.serializers import BulkLikeSerializer, LikeSerializer
 
 # LikeList class for handling listing and creating likes
-class LikeList(generics.ListCreateAPIView):
+class LikeList(SelectRelatedMixin, generics.ListCreateAPIView):
     """
     List likes or create a like if logged in.
     This view handles GET requests to list all likes and POST requests to create a new like.
@@ -13,6 +16,7 @@ class LikeList(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # Permissions - allow any read actions but restrict write actions to authenticated users
     serializer_class = LikeSerializer  # Specifies the serializer to use for request/response data formatting
     queryset = Like.objects.all()  # The queryset representing the database query to be executed for likes
+    pagination_class = FeedPagination  # Page numbers by default, keyset with ?pagination=keyset
 
     def perform_create(self, serializer):
         """
@@ -22,7 +26,7 @@ class LikeList(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)  # Save the like instance with the owner field set to the currently authenticated user
 
 # LikeDetail class for handling individual like retrieval and deletion
-class LikeDetail(generics.RetrieveDestroyAPIView):
+class LikeDetail(SelectRelatedMixin, generics.RetrieveDestroyAPIView):
     """
     Retrieve a like or delete it by id if you own it.
     This view handles GET requests for retrieving a like and DELETE requests for deleting a like.
@@ -30,3 +34,39 @@ class LikeDetail(generics.RetrieveDestroyAPIView):
     permission_classes = [IsOwnerOrReadOnly]  # Custom permission - allows operations only if the user is the owner of the like
     serializer_class = LikeSerializer  # Specifies the serializer for like data
     queryset = Like.objects.all()  # The queryset for retrieving the like from the database
+
+# BulkLikeView class for liking and unliking many posts in one request
+class BulkLikeView(generics.GenericAPIView):
+    """
+    Like and unlike many posts at once if logged in.
+    Takes {"like": [post ids], "unlike": [post ids]} and answers with the
+    outcome for each post id, in the order they were sent:
+    "created", "exists" or "not_found" (no such post) for likes, and
+    "deleted" or "not_liked" for unlikes.
+    """
+    permission_classes = [permissions.IsAuthenticated]  # Only logged in users can like posts
+    serializer_class = BulkLikeSerializer  # Validates the lists of post ids
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        like, unlike = serializer.validated_data['like'], serializer.validated_data['unlike']
+
+        like_ids, created = like_posts(request.user, like) if like else ({}, set())
+        unliked = unlike_posts(request.user, unlike) if unlike else set()
+
+        results = []
+        for pk in like:
+            if pk not in like_ids:
+                results.append({'post': pk, 'status': 'not_found'})
+            else:
+                results.append({
+                    'post': pk,
+                    'status': 'created' if pk in created else 'exists',
+                    'like_id': like_ids[pk],
+                })
+        for pk in unlike:
+            results.append({
+                'post': pk, 'status': 'deleted' if pk in unliked else 'not_liked',
+            })
+        return Response({'results': results})
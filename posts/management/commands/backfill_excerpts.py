@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from drf_api.cache import bump_tags
+from posts.models import Post, stale_excerpts
+
+
+class Command(BaseCommand):
+    """
+    Store the excerpt of every post whose stored excerpt doesn't match
+    its content, e.g. posts written before excerpts were stored on save.
+    """
+    help = 'Recompute the stored excerpts of posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts read and updated at a time.',
+        )
+
+    def handle(self, *args, **options):
+        updated = 0
+        for posts in stale_excerpts(Post.objects.all(), options['batch_size']):
+            updated += self.store(posts)
+        self.stdout.write(f'Updated {updated} excerpt(s).')
+
+    def store(self, posts):
+        # bulk_update sends no signals, so cached responses are dropped here
+        Post.objects.bulk_update(posts, ['excerpt'])
+        bump_tags('posts', *(f'post:{post.pk}' for post in posts))
+        return len(posts)
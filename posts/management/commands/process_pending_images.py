@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from drf_api.images import ImageStatus, process_image
+from posts.models import Post
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    """
+    Run the staged images of pending posts and profiles through the image
+    pipeline, e.g. ones whose jobs were lost when the server restarted.
+    """
+    help = 'Process the staged images of posts and profiles still pending.'
+
+    def handle(self, *args, **options):
+        processed = 0
+        for model in (Post, Profile):
+            pending = list(model.objects.filter(
+                image_status=ImageStatus.PENDING
+            ).exclude(staged_image='').values_list('pk', flat=True))
+            for pk in pending:
+                process_image(model, pk)
+            processed += model.objects.filter(pk__in=pending).exclude(
+                image_status=ImageStatus.PENDING
+            ).count()
+        self.stdout.write(f'Processed {processed} pending image(s).')
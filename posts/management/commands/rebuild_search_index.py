@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from drf_api.cache import bump_tags
+from posts.models import Post
+from posts.search import clear_index, index_posts
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the full-text search rows of every post, e.g. after posts were
+    bulk loaded without signals or users changed their usernames.
+    """
+    help = 'Rebuild the full-text search index of posts.'
+
+    def handle(self, *args, **options):
+        rows = Post.objects.values_list(
+            'pk', 'title', 'content', 'owner__username'
+        )
+        with transaction.atomic():
+            clear_index()
+            index_posts(rows.iterator())
+        bump_tags('posts')
+        self.stdout.write(f'Indexed {rows.count()} post(s).')
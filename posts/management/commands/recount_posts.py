@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from drf_api.cache import bump_tags
+from comments.models import Comment
+from likes.models import Like
+from posts.models import Post
+
+
+def count_of(model):
+    # Correlated subquery counting the rows of model that point at a post
+    return Coalesce(Subquery(
+        model.objects.filter(post=OuterRef('pk')).order_by()
+        .values('post').annotate(total=Count('pk')).values('total')
+    ), Value(0))
+
+
+class Command(BaseCommand):
+    """
+    Recompute Post.likes_count and Post.comments_count from the likes and
+    comments tables and repair any post whose stored counters have drifted.
+    """
+    help = 'Recompute the denormalized like and comment counters on posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted posts without repairing them.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = Post.objects.annotate(
+                actual_likes=count_of(Like),
+                actual_comments=count_of(Comment),
+            ).filter(
+                ~Q(likes_count=F('actual_likes'))
+                | ~Q(comments_count=F('actual_comments'))
+            ).values_list('pk', flat=True)
+            drifted = list(drifted)
+
+            if drifted and not options['dry_run']:
+                Post.objects.filter(pk__in=drifted).update(
+                    likes_count=count_of(Like),
+                    comments_count=count_of(Comment),
+                )
+                bump_tags('posts', *(f'post:{pk}' for pk in drifted))
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb} {len(drifted)} drifted post(s).')
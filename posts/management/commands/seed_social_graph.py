@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from drf_api.seeding import seed_social_graph
+
+
+class Command(BaseCommand):
+    """
+    Fill the database with a synthetic, power-law distributed social graph
+    of users, follows, posts, likes and comments for load testing.
+    """
+    help = 'Generate a synthetic social graph for load tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Number of users to create.',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Average number of users each user follows.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=5,
+            help='Average number of posts per user.',
+        )
+        parser.add_argument(
+            '--likes', type=int, default=10,
+            help='Average number of likes per post.',
+        )
+        parser.add_argument(
+            '--comments', type=int, default=2,
+            help='Average number of comments per post.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Posts are spread over this many days before now.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed; the same seed generates the same graph.',
+        )
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Usernames are the prefix followed by a number.',
+        )
+        parser.add_argument(
+            '--password', default='pass',
+            help='Password of every generated user.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('At least 2 users are needed.')
+        prefix = options['prefix']
+        if User.objects.filter(username=f'{prefix}0').exists():
+            raise CommandError(
+                f'User {prefix}0 already exists, pick another --prefix.'
+            )
+        created = seed_social_graph(
+            users=options['users'], follows=options['follows'],
+            posts=options['posts'], likes=options['likes'],
+            comments=options['comments'], days=options['days'],
+            seed=options['seed'], prefix=prefix,
+            password=options['password'],
+        )
+        self.stdout.write('Created {}.'.format(', '.join(
+            f'{count} {name}' for name, count in created.items()
+        )))
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', '-created_at'], name='post_category_created_idx'),
+        ),
+    ]
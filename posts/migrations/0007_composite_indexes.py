@@ -0,0 +1,17 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='post_owner_created_idx'),
+        ),
+    ]
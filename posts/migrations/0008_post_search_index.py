@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The SQL is written out here rather than taken from posts.search, so this
+# migration keeps doing what it did when it was written
+
+SQLITE_CREATE = """
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        title, content, username, tokenize = 'porter unicode61'
+    )
+"""
+SQLITE_FILL = """
+    INSERT INTO posts_post_fts (rowid, title, content, username)
+    SELECT posts_post.id, posts_post.title, posts_post.content,
+        auth_user.username
+    FROM posts_post INNER JOIN auth_user ON auth_user.id = posts_post.owner_id
+"""
+
+POSTGRES_CREATE = """
+    CREATE TABLE posts_post_fts (
+        post_id bigint PRIMARY KEY
+            REFERENCES posts_post (id) ON DELETE CASCADE
+            DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    );
+    CREATE INDEX posts_post_fts_document_idx
+        ON posts_post_fts USING gin (document)
+"""
+POSTGRES_FILL = """
+    INSERT INTO posts_post_fts (post_id, document)
+    SELECT posts_post.id,
+        setweight(to_tsvector('english', posts_post.title), 'A')
+        || setweight(to_tsvector('english', posts_post.content), 'B')
+        || setweight(to_tsvector('simple', auth_user.username), 'A')
+    FROM posts_post INNER JOIN auth_user ON auth_user.id = posts_post.owner_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_FILL)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_CREATE)
+        schema_editor.execute(POSTGRES_FILL)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
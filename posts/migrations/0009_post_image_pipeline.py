@@ -0,0 +1,23 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='staged_image',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
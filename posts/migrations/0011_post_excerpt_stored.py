@@ -0,0 +1,51 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:40
+
+import re
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 100
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    # A copy of posts.models.make_excerpt as it was when this migration
+    # was written, so later changes to it don't change what this stores
+    if len(content) <= length:
+        return content
+    match = re.match(rf'(.{{0,{length}}})\s', content, re.DOTALL)
+    cut = match.group(1).rstrip() if match else ''
+    return (cut or content[:length]) + '...'
+
+
+def fill_excerpts(apps, schema_editor):
+    # Excerpts are read from the column from now on, so posts written
+    # before they were stored on save get theirs here
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').only('id', 'content', 'excerpt')
+    stale = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        excerpt = make_excerpt(post.content)
+        if post.excerpt != excerpt:
+            post.excerpt = excerpt
+            stale.append(post)
+        if len(stale) == BATCH_SIZE:
+            Post.objects.bulk_update(stale, ['excerpt'])
+            stale = []
+    if stale:
+        Post.objects.bulk_update(stale, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
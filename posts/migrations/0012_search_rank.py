@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def set_search_rank(apps, schema_editor):
+    # FTS5 stores the rank function in the table, so it applies to every
+    # later query; title and username matches rank above content matches
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (posts_post_fts, rank) "
+            "VALUES ('rank', %s)",
+            ['bm25(10.0, 1.0, 5.0)'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_excerpt_stored'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_search_rank, migrations.RunPython.noop),
+    ]
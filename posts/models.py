@@ -1,5 +1,49 @@
+import re
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from drf_api.cache import bump_tags
+from drf_api.images import ImageStatus, discard_staged_image
+from followers.models import Follower
+from .search import index_posts, unindex_post
+
+
+# Excerpts hold at most this many characters of a post's content
+EXCERPT_LENGTH = 100
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """
+    Cut content down to at most length characters, ending at a word
+    boundary, and mark the cut with '...'. A single word longer than
+    length is cut where it reaches the limit.
+    """
+    if len(content) <= length:
+        return content
+    # The longest prefix that is followed by whitespace
+    match = re.match(rf'(.{{0,{length}}})\s', content, re.DOTALL)
+    cut = match.group(1).rstrip() if match else ''
+    return (cut or content[:length]) + '...'
+
+
+def stale_excerpts(posts, batch_size):
+    """
+    Yield the posts of a queryset whose stored excerpt doesn't match their
+    content, with the excerpt recomputed but not saved, in lists of up to
+    batch_size.
+    """
+    posts = posts.order_by('pk').only('id', 'content', 'excerpt')
+    stale = []
+    for post in posts.iterator(chunk_size=batch_size):
+        excerpt = make_excerpt(post.content)
+        if post.excerpt != excerpt:
+            post.excerpt = excerpt
+            stale.append(post)
+        if len(stale) == batch_size:
+            yield stale
+            stale = []
+    if stale:
+        yield stale
 
 
 class Categories(models.TextChoices):
@@ -17,6 +61,49 @@ class Categories(models.TextChoices):
     TRAVEL = 'travel'
 
 
+class PostQuerySet(models.QuerySet):
+    """
+    QuerySet helpers shared by the post views.
+    """
+
+    def with_like_id(self, user):
+        # Annotates each post with the id of the requesting user's like, so a
+        # whole page resolves its like_id values in the same query.
+        # Imported here as likes.models depends on this module.
+        from likes.models import Like
+
+        if not user.is_authenticated:
+            return self.annotate(like_id=models.Value(
+                None, output_field=models.BigIntegerField()
+            ))
+        return self.annotate(like_id=models.Subquery(
+            Like.objects.filter(
+                owner=user, post=models.OuterRef('pk')
+            ).values('id')[:1]
+        ))
+
+    def with_author_following_id(self, user):
+        # Annotates each post with the id of the requesting user's follow of
+        # its owner, as Profile.objects.with_following_id does for profiles
+        if not user.is_authenticated:
+            return self.annotate(author_following_id=models.Value(
+                None, output_field=models.BigIntegerField()
+            ))
+        return self.annotate(author_following_id=models.Subquery(
+            Follower.objects.filter(
+                owner=user, followed=models.OuterRef('owner')
+            ).values('id')[:1]
+        ))
+
+    def page_keys_only(self):
+        # Loads just what PostListSerializer needs to find each post's
+        # cached body; bodies that aren't cached are fetched separately.
+        # updated_at and the counters feed the list views' weak ETags.
+        return self.select_related(None).only(
+            'id', 'owner', 'created_at', 'updated_at',
+            'likes_count', 'comments_count',
+        )
+
 
 class Post(models.Model):
     """
@@ -57,11 +144,9 @@ class Post(models.Model):
     # The main content of the post, can be left blank
     content = models.TextField(blank=True)
 
-    excerpt = models.TextField(blank=True)
-
-
-
-
+    # The start of content, stored by store_excerpt whenever the post is
+    # saved so post lists can leave content out of their queries
+    excerpt = models.TextField(blank=True, editable=False)
 
     # A choice field to categorize the post
     category = models.CharField(max_length=50, choices=Categories.choices,
@@ -78,13 +163,101 @@ class Post(models.Model):
         max_length=32, choices=image_filter_choices, default='normal'
     )
 
+    # A new upload waits in local staging as staged_image, with the post
+    # 'pending', until the image pipeline has stored it as image
+    image_status = models.CharField(
+        max_length=16, choices=ImageStatus.choices,
+        default=ImageStatus.READY, editable=False,
+    )
+    staged_image = models.CharField(max_length=255, blank=True, editable=False)
+    # Stored names of the image's IMAGE_RENDITIONS, keyed by rendition
+    image_renditions = models.JSONField(default=dict, editable=False)
+
+    # Denormalized counters, kept in step by the Like and Comment signal
+    # handlers and repaired with the recount_posts management command
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         # Orders posts in descending order based on their creation time
         ordering = ['-created_at']
+        # Back the likes_count/comments_count ordering options of PostList
+        indexes = [
+            models.Index(fields=['likes_count'], name='post_likes_count_idx'),
+            models.Index(
+                fields=['comments_count'], name='post_comments_count_idx'
+            ),
+            # Serves CategoryView's exact category match and keyset pages
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='post_category_keyset_idx',
+            ),
+            # Serves keyset pagination on (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'], name='post_keyset_idx'
+            ),
+            # Serves PostList?owner__profile= and the followed feed, which
+            # filter on owner and order newest first
+            models.Index(
+                fields=['owner', '-created_at', '-id'],
+                name='post_owner_created_idx',
+            ),
+        ]
 
     def __str__(self):
         # String representation of a post, showing its ID and title
         return f'{self.id} {self.title}'
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # The counters are only changed by UPDATEs relative to the stored
+        # value, so saving an existing post doesn't write back the ones it
+        # was loaded with
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('likes_count', 'comments_count')
+            ]
+        # store_excerpt rewrites the excerpt whenever content is saved
+        if 'content' in (update_fields or ()):
+            update_fields = {*update_fields, 'excerpt'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Posts show up in post lists, their own detail page and the owner's
+    # posts_count on profiles
+    bump_tags(
+        'posts', 'profiles', f'post:{instance.pk}', f'user:{instance.owner_id}'
+    )
+
+
+post_save.connect(invalidate_cached_responses, sender=Post)
+post_delete.connect(invalidate_cached_responses, sender=Post)
+
+
+def store_excerpt(sender, instance, **kwargs):
+    instance.excerpt = make_excerpt(instance.content)
+
+
+pre_save.connect(store_excerpt, sender=Post)
+
+
+def update_search_index(sender, instance, **kwargs):
+    index_posts([(
+        instance.pk, instance.title, instance.content, instance.owner.username
+    )])
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+post_save.connect(update_search_index, sender=Post)
+post_delete.connect(remove_from_search_index, sender=Post)
+
+
+post_delete.connect(discard_staged_image, sender=Post)
 
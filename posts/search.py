@@ -0,0 +1,130 @@
+"""
+Full-text search over post titles, content and owner usernames.
+
+Each post has a row in the posts_post_fts table, written when the post is
+saved and removed when it is deleted. On SQLite the table is an FTS5
+virtual table ranked with bm25; on PostgreSQL it holds a weighted tsvector
+behind a GIN index. Other databases fall back to DRF's SearchFilter. The
+table is created by migration 0008, and 0012 sets its SQLite ranking.
+"""
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+SUPPORTED_VENDORS = ('sqlite', 'postgresql')
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('english', %s), 'A')
+    || setweight(to_tsvector('english', %s), 'B')
+    || setweight(to_tsvector('simple', %s), 'A')
+"""
+
+
+def index_posts(rows):
+    """
+    Write the search rows for (post id, title, content, username) tuples,
+    replacing any existing row of the same post.
+    """
+    if connection.vendor not in SUPPORTED_VENDORS:
+        return
+    with connection.cursor() as cursor:
+        for pk, title, content, username in rows:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'DELETE FROM posts_post_fts WHERE rowid = %s', [pk]
+                )
+                cursor.execute(
+                    'INSERT INTO posts_post_fts '
+                    '(rowid, title, content, username) '
+                    'VALUES (%s, %s, %s, %s)',
+                    [pk, title, content, username],
+                )
+            else:
+                cursor.execute(
+                    'INSERT INTO posts_post_fts (post_id, document) '
+                    f'VALUES (%s, {POSTGRES_DOCUMENT}) '
+                    'ON CONFLICT (post_id) DO UPDATE '
+                    'SET document = EXCLUDED.document',
+                    [pk, title, content, username],
+                )
+
+
+def unindex_post(pk):
+    if connection.vendor not in SUPPORTED_VENDORS:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'post_id'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM posts_post_fts WHERE {column} = %s', [pk]
+        )
+
+
+def clear_index():
+    if connection.vendor in SUPPORTED_VENDORS:
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_post_fts')
+
+
+def sqlite_match_query(terms):
+    # Quote each term so FTS5 syntax in user input is matched literally,
+    # and prefix match it like the old icontains search did
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""')) for term in terms
+    )
+
+
+def search(queryset, terms):
+    """
+    Filter a Post queryset down to the posts matching every term and
+    annotate each with a search_rank, higher being more relevant.
+    """
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        query = sqlite_match_query(terms)
+        matches = RawSQL(
+            'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+            [query],
+        )
+        # The matches are ranked once, in a subquery that LIMIT -1 keeps
+        # SQLite from flattening into the correlated one, which would run
+        # the MATCH again for every post
+        rank = RawSQL(
+            'SELECT -matched.rank FROM ('
+            'SELECT rowid, rank FROM posts_post_fts '
+            'WHERE posts_post_fts MATCH %s LIMIT -1'
+            f') matched WHERE matched.rowid = "{table}"."id"',
+            [query], output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+    query = ' '.join(terms)
+    matches = RawSQL(
+        'SELECT post_id FROM posts_post_fts '
+        "WHERE document @@ websearch_to_tsquery('english', %s)",
+        [query],
+    )
+    rank = RawSQL(
+        "SELECT ts_rank(document, websearch_to_tsquery('english', %s)) "
+        f'FROM posts_post_fts WHERE post_id = "{table}"."id"',
+        [query], output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on PostList that serves ?search=
+    from the full-text index, most relevant first unless the request asks
+    for an explicit ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor not in SUPPORTED_VENDORS:
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = search(queryset, terms)
+        if filters.OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.order_by('-search_rank', '-created_at')
@@ -1,10 +1,126 @@
+import hashlib
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from drf_api.cache import CACHE_ALIAS, current_versions
+from drf_api.fields import SparseFieldsMixin, serializer_field_names
+from drf_api.images import ImagePipelineSerializerMixin, rendition_urls
+from drf_api.values import ValuesSerializer
 from posts.models import Post
 from likes.models import Like
+from profiles.models import Profile
 from .models import Categories
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of posts in two stages. The part of each post that is
+    the same for every viewer is cached per post id and version, the
+    version being the response cache tokens of the post and its owner, so
+    any write that would change it moves it to a new key. The per-viewer
+    fields (is_owner, like_id) are then worked out for the whole page at
+    once and merged on top. Sparse fieldsets get bodies of their own,
+    cached under a key naming their fields.
+    """
+    viewer_fields = ('is_owner', 'like_id')
+    body_key_prefix = 'post-body'
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        bodies = self.shared_bodies(posts)
+        like_ids = (
+            self.viewer_like_ids(posts) if 'like_id' in self.child.fields
+            else {}
+        )
+        user = self.context['request'].user
+
+        representations = []
+        for post in posts:
+            if post.pk not in bodies:
+                # Deleted since the page was read
+                continue
+            viewer = {
+                'is_owner': user.is_authenticated and user.id == post.owner_id,
+                'like_id': like_ids.get(post.pk),
+            }
+            representations.append(OrderedDict(
+                (name, viewer[name] if name in viewer else value)
+                for name, value in bodies[post.pk].items()
+            ))
+        return representations
+
+    def sparse_fields(self):
+        # None unless the request trims the fields
+        fields = list(self.child.fields)
+        if len(fields) == len(serializer_field_names(type(self.child))):
+            return None
+        return fields
+
+    def body_keys(self, posts):
+        prefix = self.body_key_prefix
+        fields = self.sparse_fields()
+        if fields is not None:
+            prefix += ':' + hashlib.md5(','.join(fields).encode()).hexdigest()
+        tags = set()
+        for post in posts:
+            tags.update((f'post:{post.pk}', f'user:{post.owner_id}'))
+        versions = current_versions(tags)
+        return {
+            post.pk: '{}:{}:{}:{}'.format(
+                prefix, post.pk, versions[f'post:{post.pk}'],
+                versions[f'user:{post.owner_id}'],
+            )
+            for post in posts
+        }
+
+    def shared_bodies(self, posts):
+        if not settings.POST_BODY_CACHE:
+            return self.build_bodies([post.pk for post in posts])
+        cache = caches[CACHE_ALIAS]
+        keys = self.body_keys(posts)
+        cached = cache.get_many(keys.values())
+        bodies = {
+            pk: cached[key] for pk, key in keys.items() if key in cached
+        }
+
+        missing = [pk for pk in keys if pk not in bodies]
+        if missing:
+            built = self.build_bodies(missing)
+            cache.set_many({keys[pk]: body for pk, body in built.items()})
+            bodies.update(built)
+        return bodies
+
+    def build_bodies(self, pks):
+        # The page query may have loaded only what the keys need, so
+        # bodies are built from one .values() query
+        fields = self.sparse_fields()
+        values = self.get_values_serializer_class()(
+            context=self.context, fields=fields
+        )
+        rows = values.values(Post.objects.filter(pk__in=pks), fields)
+        # id is always selected, even when the fieldset leaves it out
+        return {row['id']: values.shared_representation(row) for row in rows}
+
+    def get_values_serializer_class(self):
+        return PostValuesSerializer
+
+    def viewer_like_ids(self, posts):
+        # The post views annotate like_id on the page query; otherwise the
+        # viewer's likes for the whole page come from one query
+        if all(hasattr(post, 'like_id') for post in posts):
+            return {post.pk: post.like_id for post in posts}
+        user = self.context['request'].user
+        if not user.is_authenticated:
+            return {}
+        return dict(Like.objects.filter(
+            owner=user, post__in=[post.pk for post in posts]
+        ).values_list('post_id', 'id'))
+
+
+class PostSerializer(SparseFieldsMixin, ImagePipelineSerializerMixin, serializers.ModelSerializer):
     # Serializer fields to represent the 'owner' by their username
     owner = serializers.ReadOnlyField(source='owner.username')
 
@@ -13,11 +129,13 @@ class PostSerializer(serializers.ModelSerializer):
 
     # Additional fields to represent the owner's profile ID and profile image URL
     profile_id = serializers.ReadOnlyField(source='owner.profile.id')
-    profile_image = serializers.ReadOnlyField(source='owner.profile.image.url')
+    # The owner's profile image in its thumbnail rendition
+    profile_image = serializers.SerializerMethodField()
     like_id = serializers.SerializerMethodField()
     likes_count = serializers.ReadOnlyField()
     comments_count = serializers.ReadOnlyField()
-    excerpt = serializers.SerializerMethodField()
+    # Stored on save, see posts.models.make_excerpt
+    excerpt = serializers.ReadOnlyField()
 
 
     def validate_image(self, value):
@@ -26,23 +144,28 @@ class PostSerializer(serializers.ModelSerializer):
         if value.size > 2 * 1024 * 1024:
             raise serializers.ValidationError('Image size larger than 2MB!')
 
-        # Check if the image height exceeds 4096 pixels
-        if value.image.height > 4096:
-            raise serializers.ValidationError('Image height larger than 4096px!')
-
-        # Check if the image width exceeds 4096 pixels
-        if value.image.width > 4096:
-            raise serializers.ValidationError('Image width larger than 4096px!')
-
+        # Format and dimensions are checked from the header by the image
+        # field; images larger than IMAGE_MAX_DIMENSION are scaled down by
+        # the image pipeline rather than rejected here
         return value
 
+    def get_profile_image(self, obj):
+        profile = obj.owner.profile
+        return rendition_urls(
+            profile.image.url, profile.image_renditions, profile.image.storage.url
+        )['thumb']
+
     def get_is_owner(self, obj):
-        # Method to determine if the request user is the owner of the post
-        request = self.context['request']
-        return request.user == obj.owner
+        # Method to determine if the request user is the owner of the post.
+        # Compares ids, so the owner row isn't needed
+        return self.context['request'].user.pk == obj.owner_id
 
     def get_like_id(self, obj):
         user = self.context['request'].user
+        if hasattr(obj, 'like_id'):
+            # List and detail views annotate like_id for the whole page
+            # through Post.objects.with_like_id, so no extra query is needed
+            return obj.like_id
         if user.is_authenticated:
             # First checks if the user already liked
             # the post we are trying to retrieve
@@ -54,16 +177,148 @@ class PostSerializer(serializers.ModelSerializer):
             return like.id if like else None
         return None
 
-    def get_excerpt(self, obj):
-        # Generate an excerpt by slicing the content
-        return obj.content[:100] + '...'  # Adjust slice as needed
+    def shared_representation(self, instance):
+        """
+        Represent the fields that are the same for every viewer, leaving
+        placeholders for the viewer fields so the field order is kept.
+        """
+        ret = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in PostListSerializer.viewer_fields:
+                ret[field.field_name] = None
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            ret[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return ret
 
     class Meta:
         # Meta class to specify the model and fields used in the serializer
         model = Post
+        list_serializer_class = PostListSerializer
+        # Relations read by method fields, for SelectRelatedMixin
+        related_sources = {'profile_image': 'owner.profile'}
         fields = [
             'id', 'owner', 'is_owner', 'profile_id',
             'profile_image', 'created_at', 'updated_at',
-            'title', 'content', 'image', 'image_filter', 
-            'like_id',  'likes_count', 'comments_count', 'category', 'excerpt',
+            'title', 'content', 'image', 'image_filter', 'image_status',
+            'image_renditions', 'like_id',  'likes_count', 'comments_count', 'category', 'excerpt',
         ]
+
+
+class PostValuesSerializer(ValuesSerializer):
+    """
+    Read-only PostSerializer for .values() rows, with the same output
+    except that image is the feed sized rendition, as lists and the feed
+    show it smaller
+    """
+    columns = (
+        'id', 'owner_id', 'owner__username', 'owner__profile__id',
+        'owner__profile__image', 'owner__profile__image_renditions',
+        'created_at', 'updated_at', 'title',
+        'content', 'image', 'image_filter', 'image_status',
+        'image_renditions', 'likes_count', 'comments_count', 'category',
+        'excerpt',
+    )
+    field_columns = {
+        'owner': ('owner__username',),
+        'profile_id': ('owner__profile__id',),
+        'profile_image': (
+            'owner__profile__image', 'owner__profile__image_renditions',
+        ),
+        'content': ('content',),
+        'image': ('image', 'image_renditions'),
+        'image_renditions': ('image', 'image_renditions'),
+    }
+    image_field = Post._meta.get_field('image')
+    profile_image_field = Profile._meta.get_field('image')
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        # like_id is there when the view annotated it with with_like_id
+        columns = cls.selected_columns(fields)
+        if 'like_id' in queryset.query.annotations:
+            columns += ('like_id',)
+        return queryset.values(*columns)
+
+    def to_representation(self, row):
+        renditions = self.renditions(
+            self.image_field, row['image'], row['image_renditions'],
+        )
+        return {
+            'id': row['id'],
+            'owner': row['owner__username'],
+            'is_owner': self.is_owner(row['owner_id']),
+            'profile_id': row['owner__profile__id'],
+            'profile_image': self.renditions(
+                self.profile_image_field, row['owner__profile__image'],
+                row['owner__profile__image_renditions'], self.file_url,
+            )['thumb'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+            'title': row['title'],
+            'content': row['content'],
+            'image': renditions['feed'],
+            'image_filter': row['image_filter'],
+            'image_status': row['image_status'],
+            'image_renditions': renditions,
+            'like_id': row.get('like_id'),
+            'likes_count': row['likes_count'],
+            'comments_count': row['comments_count'],
+            'category': row['category'],
+            'excerpt': row['excerpt'],
+        }
+
+    def shared_representation(self, row):
+        # As PostSerializer.shared_representation, with placeholders for
+        # the viewer fields
+        ret = self.represent(row)
+        for name in PostListSerializer.viewer_fields:
+            if name in ret:
+                ret[name] = None
+        return ret
+
+
+class PostExcerptListSerializer(PostListSerializer):
+    """
+    PostListSerializer for post lists without content, caching their
+    bodies under their own keys.
+    """
+    body_key_prefix = 'post-excerpt-body'
+
+    def get_values_serializer_class(self):
+        return PostExcerptValuesSerializer
+
+
+class PostExcerptSerializer(PostSerializer):
+    """
+    PostSerializer without content, for lists that show only the stored
+    excerpt.
+    """
+
+    class Meta(PostSerializer.Meta):
+        list_serializer_class = PostExcerptListSerializer
+        fields = [
+            field for field in PostSerializer.Meta.fields if field != 'content'
+        ]
+
+
+class PostExcerptValuesSerializer(PostValuesSerializer):
+    """
+    Read-only PostExcerptSerializer for .values() rows, leaving the
+    content column out of the query
+    """
+    columns = tuple(
+        column for column in PostValuesSerializer.columns
+        if column != 'content'
+    )
+
+    def to_representation(self, row):
+        ret = super().to_representation(dict(row, content=None))
+        del ret['content']
+        return ret
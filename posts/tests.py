@@ -1,7 +1,31 @@
+import shutil
+import tempfile
+import time
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
+from django.apps import apps
 from django.contrib.auth.models import User
-from .models import Post
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from PIL import Image
+from comments.models import Comment
+from feed.models import TimelineEntry
+from followers.models import Follower
+from likes.models import Like
+from drf_api.images import ImageStatus, process_image, staging_storage
+from profiles.models import Profile
+from .models import Post, make_excerpt
+from .serializers import PostSerializer
+from .views import PostList
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 
 class PostListViewTests(APITestCase):
     def setUp(self):
@@ -89,3 +113,887 @@ class PostDetailViewTests(APITestCase):
         # Asserts that the response status is 403 Forbidden, indicating 'adam' can't update 'brian's post.
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+
+class PostLikeIdTests(APITestCase):
+    def setUp(self):
+        # Adam likes one of brian's posts; the other posts stay unliked.
+        User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        self.liked = Post.objects.create(owner=self.brian, title='liked')
+        self.like = Like.objects.create(
+            owner=User.objects.get(username='adam'), post=self.liked
+        )
+
+    def like_queries(self):
+        # Counts the queries of one post list page that touch the likes table
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/posts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([
+            query for query in context.captured_queries
+            if 'likes_like' in query['sql']
+        ])
+
+    def test_like_id_matches_the_users_like(self):
+        Post.objects.create(owner=self.brian, title='not liked')
+        self.client.login(username='adam', password='pass')
+        response = self.client.get('/posts/')
+        like_ids = {
+            post['title']: post['like_id']
+            for post in response.data['results']
+        }
+        self.assertEqual(like_ids, {'liked': self.like.id, 'not liked': None})
+
+    def test_like_id_is_none_when_logged_out(self):
+        response = self.client.get(f'/posts/{self.liked.id}/')
+        self.assertIsNone(response.data['like_id'])
+
+    def test_like_lookups_do_not_grow_with_page_size(self):
+        # Regression test for the per-post Like query in get_like_id
+        self.client.login(username='adam', password='pass')
+        one_post = self.like_queries()
+        for i in range(5):
+            Post.objects.create(owner=self.brian, title=f'post {i}')
+        self.assertEqual(self.like_queries(), one_post)
+
+
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+
+    def test_counters_follow_likes_and_comments(self):
+        like = Like.objects.create(owner=self.brian, post=self.post)
+        Like.objects.create(owner=self.adam, post=self.post)
+        comment = Comment.objects.create(
+            owner=self.brian, post=self.post, content='hi'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(self.post.comments_count, 1)
+
+        like.delete()
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_saving_a_stale_post_keeps_its_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Like.objects.create(owner=self.brian, post=self.post)
+        Comment.objects.create(owner=self.brian, post=self.post, content='hi')
+        stale.title = 'new title'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'new title')
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_can_order_posts_by_likes_count(self):
+        popular = Post.objects.create(owner=self.brian, title='popular')
+        Like.objects.create(owner=self.adam, post=popular)
+        response = self.client.get('/posts/?ordering=-likes_count')
+        titles = [post['title'] for post in response.data['results']]
+        self.assertEqual(titles, ['popular', 'a title'])
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+    def test_recount_posts_repairs_drift(self):
+        Like.objects.create(owner=self.brian, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(
+            likes_count=7, comments_count=3
+        )
+        out = StringIO()
+        call_command('recount_posts', stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertIn('Repaired 1 drifted post(s).', out.getvalue())
+
+
+class PostQueryCountTests(APITestCase):
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        # Each post has a different owner, so lazily loading owners and
+        # profiles would add two queries per row
+        adam = User.objects.create_user(username='adam', password='pass')
+        Post.objects.create(owner=adam, title='a title')
+        one_post = self.count_queries('/posts/')
+        for i in range(5):
+            user = User.objects.create_user(username=f'user{i}', password='pass')
+            Post.objects.create(owner=user, title='a title')
+        self.assertEqual(self.count_queries('/posts/'), one_post)
+
+
+class CategoryViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        Post.objects.create(owner=self.adam, title='trip', category='travel')
+        Post.objects.create(owner=self.adam, title='news', category='world')
+
+    def test_can_list_posts_in_a_category(self):
+        response = self.client.get('/category/Travel/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [post['title'] for post in response.data['results']]
+        self.assertEqual(titles, ['trip'])
+        self.assertIn('likes_count', response.data['results'][0])
+        self.assertIn('next', response.data)
+
+    def test_unknown_category_returns_not_found(self):
+        response = self.client.get('/category/nonsense/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_first_page_is_cached_until_a_post_is_written(self):
+        self.client.get('/category/travel/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/category/travel/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.json()['results']), 1)
+
+        Post.objects.create(owner=self.adam, title='trip 2', category='travel')
+        response = self.client.get('/category/travel/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_logged_in_user_can_still_post_a_category(self):
+        self.client.login(username='adam', password='pass')
+        response = self.client.post('/category/', {'category': 'world'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [post['title'] for post in response.data['results']]
+        self.assertEqual(titles, ['news'])
+
+
+class PostPaginationTests(APITestCase):
+    def setUp(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        for i in range(25):
+            Post.objects.create(owner=adam, title=f'post {i}')
+        # Give half the posts the same timestamp so the id tie-breaker counts
+        Post.objects.filter(id__lte=12).update(
+            created_at=Post.objects.get(id=12).created_at
+        )
+
+    def test_keyset_pages_walk_every_post_once(self):
+        ids = []
+        url = '/posts/?pagination=keyset'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 25)
+
+    def test_keyset_count_is_opt_in(self):
+        response = self.client.get('/posts/?pagination=keyset&count=true')
+        self.assertEqual(response.data['count'], 25)
+
+    def test_page_numbers_can_skip_the_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/posts/?page=3&count=false')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ))
+
+    def test_invalid_cursor_returns_not_found(self):
+        response = self.client.get('/posts/?cursor=bm9wZQ==')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        Post.objects.create(
+            owner=adam, title='Hiking trips', content='mountains and lakes'
+        )
+        Post.objects.create(
+            owner=brian, title='Cooking', content='a hiking snack recipe'
+        )
+        Post.objects.create(owner=brian, title='Gardening', content='roses')
+
+    def search_titles(self, term):
+        response = self.client.get(f'/posts/?search={term}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_title_matches_rank_above_content_matches(self):
+        self.assertEqual(self.search_titles('hiking'), ['Hiking trips', 'Cooking'])
+
+    def test_can_search_by_owner_username_and_prefix(self):
+        self.assertEqual(self.search_titles('bri'), ['Gardening', 'Cooking'])
+        self.assertEqual(self.search_titles('gard'), ['Gardening'])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(title='Gardening')
+        post.title = 'Tulips'
+        post.save()
+        self.assertEqual(self.search_titles('gardening'), [])
+        self.assertEqual(self.search_titles('tulips'), ['Tulips'])
+        post.delete()
+        self.assertEqual(self.search_titles('tulips'), [])
+
+    def test_rebuild_search_index(self):
+        Post.objects.bulk_create([
+            Post(owner=User.objects.get(username='adam'), title='Bulk loaded')
+        ])
+        self.assertEqual(self.search_titles('bulk'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search_titles('bulk'), ['Bulk loaded'])
+
+
+@override_settings(RESPONSE_CACHE=True)
+class PostResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+
+    def test_anonymous_reads_are_served_from_the_cache(self):
+        self.assertEqual(self.client.get('/posts/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/posts/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['results'][0]['title'], 'a title')
+
+    def test_likes_invalidate_the_post_list_and_detail(self):
+        for url in ['/posts/', f'/posts/{self.post.id}/']:
+            self.client.get(url)
+        Like.objects.create(owner=self.adam, post=self.post)
+
+        response = self.client.get('/posts/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['likes_count'], 1)
+        response = self.client.get(f'/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['likes_count'], 1)
+
+    def test_profile_changes_invalidate_the_owners_posts(self):
+        self.client.get(f'/posts/{self.post.id}/')
+        self.adam.profile.save()
+        response = self.client.get(f'/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_logged_in_reads_are_not_cached(self):
+        self.client.login(username='adam', password='pass')
+        self.client.get('/posts/')
+        response = self.client.get('/posts/')
+        self.assertNotIn('X-Cache', response)
+        self.assertTrue(response.data['results'][0]['is_owner'])
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        self.client.get('/posts/')
+        response = self.client.get('/posts/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_writes_bump_the_tags_again_on_commit(self):
+        # A logged out read between the write and its commit caches the
+        # old rows against the versions bumped by the write
+        self.client.get(f'/posts/{self.post.id}/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            Like.objects.create(owner=self.adam, post=self.post)
+            self.client.get(f'/posts/{self.post.id}/')
+        self.assertEqual(
+            self.client.get(f'/posts/{self.post.id}/')['X-Cache'], 'HIT'
+        )
+        for callback in callbacks:
+            callback()
+        response = self.client.get(f'/posts/{self.post.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+
+@override_settings(POST_BODY_CACHE=True)
+class PostBodyCacheTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, len(context.captured_queries)
+
+    def test_cached_bodies_save_a_query_for_logged_in_users(self):
+        self.client.login(username='adam', password='pass')
+        _, cold = self.count_queries('/posts/')
+        response, warm = self.count_queries('/posts/')
+        self.assertEqual(warm, cold - 1)
+        self.assertTrue(response.data['results'][0]['is_owner'])
+
+    @override_settings(POST_BODY_CACHE=False)
+    def test_bodies_are_not_cached_without_a_shared_cache(self):
+        self.client.login(username='adam', password='pass')
+        _, cold = self.count_queries('/posts/')
+        _, warm = self.count_queries('/posts/')
+        self.assertEqual(warm, cold)
+
+    def test_posts_deleted_after_the_page_query_are_skipped(self):
+        Post.objects.create(owner=self.brian, title='another title')
+        posts = list(Post.objects.order_by('pk').page_keys_only())
+        Post.objects.filter(pk=posts[0].pk).delete()
+        request = APIRequestFactory().get('/posts/')
+        request.user = self.adam
+        data = PostSerializer(
+            posts, many=True, context={'request': request}
+        ).data
+        self.assertEqual([post['title'] for post in data], ['another title'])
+
+    def test_viewer_fields_are_not_shared_between_users(self):
+        like = Like.objects.create(owner=self.brian, post=self.post)
+        self.client.login(username='adam', password='pass')
+        post = self.client.get('/posts/').data['results'][0]
+        self.assertEqual((post['is_owner'], post['like_id']), (True, None))
+
+        self.client.login(username='brian', password='pass')
+        post = self.client.get('/posts/').data['results'][0]
+        self.assertEqual((post['is_owner'], post['like_id']), (False, like.id))
+
+    def test_list_items_match_the_detail_representation(self):
+        self.client.login(username='adam', password='pass')
+        self.client.get('/posts/')
+        self.post.title = 'a new title'
+        self.post.save()
+        listed = self.client.get('/posts/').data['results'][0]
+        detail = self.client.get(f'/posts/{self.post.id}/').data
+        self.assertEqual(list(listed.items()), list(detail.items()))
+
+
+
+class PostConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(owner=self.adam, title='a title')
+        self.client.force_authenticate(self.adam)
+
+    def test_matching_etag_skips_loading_the_post(self):
+        url = f'/posts/{self.post.id}/'
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_likes_change_the_etag(self):
+        url = f'/posts/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        Like.objects.create(owner=self.adam, post=self.post)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_likes_are_not_hidden_by_if_modified_since(self):
+        # Likes don't move updated_at, so Last-Modified can't validate
+        url = f'/posts/{self.post.id}/'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        Like.objects.create(owner=self.adam, post=self.post)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_etags_differ_between_users(self):
+        url = f'/posts/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_list_page_returns_not_modified(self):
+        etag = self.client.get('/posts/')['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Post.objects.create(owner=self.adam, title='another title')
+        response = self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile_changes_change_the_list_etags(self):
+        for url in ['/posts/', '/category/world/']:
+            etag = self.client.get(url)['ETag']
+            profile = Profile.objects.get(owner=self.adam)
+            profile.name = f'{url} name'
+            profile.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_cached_anonymous_pages_answer_conditional_requests(self):
+        self.client.force_authenticate(None)
+        etag = self.client.get('/posts/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+
+class PostValuesSerializerTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.post = Post.objects.create(
+            owner=self.adam, title='Caf\u00e9 \u2029',
+            content='\U0001f600 ' * 80, image='images/photo.jpg',
+        )
+        Like.objects.create(owner=self.adam, post=self.post)
+        self.client.force_authenticate(self.adam)
+
+    def test_bodies_match_the_model_serializer(self):
+        request = self.client.get('/posts/').wsgi_request
+        context = {'request': request}
+        post = Post.objects.with_like_id(self.adam).get(pk=self.post.pk)
+        cache.clear()
+        built = PostSerializer([post], many=True, context=context).data
+        self.assertEqual(
+            list(built[0].items()),
+            list(PostSerializer(post, context=context).data.items()),
+        )
+
+    def test_post_list_renders_the_same_bytes(self):
+        fast = self.client.get('/posts/')
+        with mock.patch.object(PostList, 'fast_json', False):
+            slow = self.client.get('/posts/')
+        self.assertEqual(fast.content, slow.content)
+        self.assertIn(b'\\u2029', fast.content)
+
+
+class PostExcerptTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+
+    def test_excerpts_end_at_a_word_boundary(self):
+        self.assertEqual(make_excerpt('short post'), 'short post')
+        self.assertEqual(
+            make_excerpt('lorem ipsum dolor sit', length=14), 'lorem ipsum...'
+        )
+        self.assertEqual(
+            make_excerpt('lorem ipsum dolor sit', length=11), 'lorem ipsum...'
+        )
+        self.assertEqual(make_excerpt('a' * 20, length=10), 'a' * 10 + '...')
+
+    def test_excerpt_is_stored_on_save(self):
+        post = Post.objects.create(owner=self.adam, title='a', content='word ' * 30)
+        self.assertEqual(post.excerpt, make_excerpt(post.content))
+        self.client.force_authenticate(self.adam)
+        self.client.put(f'/posts/{post.pk}/', {'title': 'a', 'content': 'new'})
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'new')
+
+    def test_backfill_command_fills_in_stale_excerpts(self):
+        posts = [
+            Post.objects.create(owner=self.adam, title='a', content='word ' * 30)
+            for _ in range(3)
+        ]
+        Post.objects.filter(pk__in=[posts[0].pk, posts[2].pk]).update(excerpt='')
+        out = StringIO()
+        call_command('backfill_excerpts', batch_size=1, stdout=out)
+        self.assertIn('Updated 2 excerpt(s).', out.getvalue())
+        self.assertEqual(
+            set(Post.objects.values_list('excerpt', flat=True)),
+            {make_excerpt('word ' * 30)},
+        )
+
+    def test_migration_fills_in_blank_excerpts(self):
+        post = Post.objects.create(owner=self.adam, title='a', content='word ' * 30)
+        Post.objects.filter(pk=post.pk).update(excerpt='')
+        migration = import_module('posts.migrations.0011_post_excerpt_stored')
+        migration.fill_excerpts(apps, None)
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, make_excerpt('word ' * 30))
+
+    @override_settings(POST_BODY_CACHE=True)
+    def test_excerpt_lists_leave_content_out(self):
+        Post.objects.create(owner=self.adam, title='a', content='word ' * 30)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/posts/?excerpts=true')
+        self.assertNotIn('content', response.data['results'][0])
+        self.assertEqual(
+            response.data['results'][0]['excerpt'], make_excerpt('word ' * 30)
+        )
+        self.assertFalse(any(
+            '"posts_post"."content"' in query['sql'] for query in queries
+        ))
+        # Full bodies are cached apart from the excerpt-only ones
+        response = self.client.get('/posts/')
+        self.assertEqual(response.data['results'][0]['content'], 'word ' * 30)
+
+
+@override_settings(POST_BODY_CACHE=True)
+class PostSparseFieldsTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        post = Post.objects.create(owner=self.adam, title='a title', content='text')
+        Like.objects.create(owner=self.adam, post=post)
+        self.client.force_authenticate(self.adam)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in queries)
+
+    def test_fields_keeps_only_the_listed_fields(self):
+        for url in ['/posts/', '/category/world/']:
+            response, sql = self.get(f'{url}?fields=id,title')
+            self.assertEqual(
+                list(response.data['results'][0]), ['id', 'title']
+            )
+            # Neither the like subquery nor the profile join is made
+            self.assertNotIn('likes_like', sql)
+            self.assertNotIn('profiles_profile', sql)
+
+    def test_omit_drops_the_listed_fields(self):
+        response, sql = self.get('/posts/?omit=content,like_id,profile_image')
+        item = response.data['results'][0]
+        self.assertNotIn('content', item)
+        self.assertNotIn('like_id', item)
+        self.assertNotIn('profile_image', item)
+        self.assertIn('profile_id', item)
+        self.assertNotIn('likes_like', sql)
+        # Full bodies are cached apart from sparse ones
+        response, _ = self.get('/posts/')
+        self.assertEqual(response.data['results'][0]['content'], 'text')
+        self.assertIsNotNone(response.data['results'][0]['like_id'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/posts/?fields=id,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_field_lists_are_rejected(self):
+        for query in ['?fields=', '?fields=,']:
+            response = self.client.get(f'/posts/{query}')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, query
+            )
+
+
+class PostPageTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        self.post = Post.objects.create(owner=self.brian, title='a title')
+        for i in range(12):
+            Comment.objects.create(
+                owner=self.adam, post=self.post, content=f'comment {i}'
+            )
+        self.like = Like.objects.create(owner=self.adam, post=self.post)
+        self.follow = Follower.objects.create(
+            owner=self.adam, followed=self.brian
+        )
+        self.url = f'/posts/{self.post.id}/page/'
+
+    def test_page_has_the_post_profile_comments_and_viewer_state(self):
+        self.client.force_authenticate(self.adam)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['post']['title'], 'a title')
+        self.assertEqual(response.data['post']['like_id'], self.like.id)
+        self.assertEqual(response.data['profile']['owner'], 'brian')
+        self.assertEqual(response.data['profile']['followers_count'], 1)
+        self.assertEqual(
+            response.data['profile']['following_id'], self.follow.id
+        )
+        comments = response.data['comments']
+        self.assertEqual(len(comments['results']), 10)
+        self.assertEqual(comments['results'][0]['content'], 'comment 11')
+
+        # The next link continues the post's comment thread
+        response = self.client.get(comments['next'])
+        self.assertEqual(
+            [comment['content'] for comment in response.data['results']],
+            ['comment 1', 'comment 0'],
+        )
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_logged_out_pages_are_cached_until_a_comment_is_added(self):
+        response = self.client.get(self.url)
+        self.assertIsNone(response.data['post']['like_id'])
+        self.assertIsNone(response.data['profile']['following_id'])
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        Comment.objects.create(owner=self.adam, post=self.post, content='new')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            response.data['comments']['results'][0]['content'], 'new'
+        )
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_commenters_profile_changes_invalidate_the_page(self):
+        carl = User.objects.create_user(username='carl', password='pass')
+        Comment.objects.create(owner=carl, post=self.post, content='hi')
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        carl.profile.name = 'Carl'
+        carl.profile.save()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_sparse_fieldsets_are_ignored(self):
+        self.client.force_authenticate(self.adam)
+        response = self.client.get(f'{self.url}?fields=title')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('content', response.data['post'])
+        self.assertEqual(response.data['profile']['owner'], 'brian')
+
+    def test_missing_post_returns_not_found(self):
+        response = self.client.get('/posts/999/page/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+def image_upload(width=10, height=10, name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class PostImagePipelineTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.staging = tempfile.mkdtemp()
+        for directory in [self.media, self.staging]:
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # Local disk stands in for Cloudinary, and images are processed
+        # when the transaction commits instead of in a worker thread
+        settings = override_settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=self.media, IMAGE_STAGING_ROOT=self.staging,
+            IMAGE_PIPELINE_WORKERS=0, IMAGE_PIPELINE_RETRY_DELAY=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.client.force_authenticate(self.adam)
+
+    def create_post(self, image):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                '/posts/', {'title': 'a title', 'image': image}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, callbacks
+
+    def test_post_is_created_pending_and_stored_after_commit(self):
+        response, callbacks = self.create_post(image_upload())
+        self.assertEqual(response.data['image_status'], 'pending')
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertTrue(staging_storage().exists(post.staged_image))
+
+        for callback in callbacks:
+            callback()
+        post.refresh_from_db()
+        self.assertEqual(post.image_status, ImageStatus.READY)
+        self.assertTrue(post.image.name.startswith('images/'))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertEqual(post.staged_image, '')
+        self.assertEqual(staging_storage().listdir('')[1], [])
+
+    def test_large_images_are_scaled_down(self):
+        with self.settings(IMAGE_MAX_DIMENSION=100):
+            response, callbacks = self.create_post(image_upload(400, 50))
+            for callback in callbacks:
+                callback()
+        post = Post.objects.get(pk=response.data['id'])
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 13))
+
+    def test_renditions_are_stored_and_exposed(self):
+        response, callbacks = self.create_post(image_upload(2000, 1000))
+        for callback in callbacks:
+            callback()
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(set(post.image_renditions), {'thumb', 'feed', 'full'})
+        with Image.open(default_storage.open(post.image_renditions['thumb'])) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (150, 75)))
+        with Image.open(default_storage.open(post.image_renditions['feed'])) as image:
+            self.assertEqual(image.size, (640, 320))
+
+        for url in [f'/posts/{post.pk}/', '/posts/']:
+            response = self.client.get(url)
+            data = response.data if url.endswith(f'{post.pk}/') else (
+                response.data['results'][0]
+            )
+            self.assertTrue(data['image_renditions']['thumb'].endswith(
+                default_storage.url(post.image_renditions['thumb'])
+            ))
+        # Lists show the feed rendition as the image, the detail the original
+        listed = self.client.get('/posts/').data['results'][0]
+        self.assertTrue(listed['image'].endswith(
+            default_storage.url(post.image_renditions['feed'])
+        ))
+        detail = self.client.get(f'/posts/{post.pk}/').data
+        self.assertTrue(detail['image'].endswith(
+            default_storage.url(post.image.name)
+        ))
+
+    def test_images_without_renditions_fall_back_to_the_image(self):
+        post = Post.objects.create(owner=self.adam, title='a title')
+        response = self.client.get(f'/posts/{post.pk}/')
+        self.assertEqual(
+            set(response.data['image_renditions'].values()),
+            {response.data['image']},
+        )
+        self.assertEqual(
+            response.data['profile_image'], self.adam.profile.image.url
+        )
+
+    def test_uploads_are_validated_from_the_header(self):
+        response = self.client.post('/posts/', {
+            'title': 'a title',
+            'image': SimpleUploadedFile('photo.png', b'not an image'),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = image_upload(101, 10)
+        with self.settings(IMAGE_MAX_UPLOAD_DIMENSION=100), mock.patch.object(
+            Image.Image, 'load'
+        ) as load:
+            response = self.client.post(
+                '/posts/', {'title': 'a title', 'image': upload}
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        load.assert_not_called()
+
+    def test_profile_images_go_through_the_pipeline(self):
+        profile = self.adam.profile
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.put(
+                f'/profiles/{profile.pk}/', {'image': image_upload()}
+            )
+        self.assertEqual(response.data['image_status'], 'pending')
+        for callback in callbacks:
+            callback()
+        profile = Profile.objects.get(pk=profile.pk)
+        self.assertEqual(profile.image_status, ImageStatus.READY)
+        self.assertIn('thumb', profile.image_renditions)
+
+        # Posts show their owner's profile image in the thumb rendition
+        post = Post.objects.create(owner=self.adam, title='a title')
+        response = self.client.get(f'/posts/{post.pk}/')
+        self.assertEqual(
+            response.data['profile_image'],
+            default_storage.url(profile.image_renditions['thumb']),
+        )
+
+    def test_storage_errors_are_retried(self):
+        response, callbacks = self.create_post(image_upload())
+        save = default_storage._save
+        failures = iter([OSError('timeout'), OSError('timeout')])
+
+        def flaky_save(name, content):
+            error = next(failures, None)
+            if error:
+                raise error
+            return save(name, content)
+
+        with mock.patch.object(default_storage, '_save', flaky_save):
+            for callback in callbacks:
+                callback()
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(post.image_status, ImageStatus.READY)
+
+        with self.settings(IMAGE_PIPELINE_RETRIES=1), mock.patch.object(
+            default_storage, '_save', side_effect=OSError('down')
+        ), self.assertLogs('drf_api.images', 'ERROR'):
+            response, callbacks = self.create_post(image_upload())
+            for callback in callbacks:
+                callback()
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(post.image_status, ImageStatus.FAILED)
+
+    def test_unreadable_images_fail(self):
+        response, _ = self.create_post(image_upload())
+        post = Post.objects.get(pk=response.data['id'])
+        with open(staging_storage().path(post.staged_image), 'wb') as file:
+            file.write(b'not an image')
+        process_image(Post, post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image_status, ImageStatus.FAILED)
+
+    def test_updates_keep_an_image_stored_meanwhile(self):
+        response, _ = self.create_post(image_upload())
+        stale = Post.objects.get(pk=response.data['id'])
+        # The pipeline finishes the row while a request still holds the
+        # pending instance it loaded
+        process_image(Post, stale.pk)
+        serializer = PostSerializer(
+            stale, data={'title': 'new title'}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        post = Post.objects.get(pk=stale.pk)
+        self.assertEqual(post.title, 'new title')
+        self.assertEqual(post.image_status, ImageStatus.READY)
+        self.assertTrue(post.image.name.startswith('images/'))
+        self.assertEqual(post.staged_image, '')
+
+    def test_pending_images_can_be_processed_by_command(self):
+        response, _ = self.create_post(image_upload())
+        out = StringIO()
+        call_command('process_pending_images', stdout=out)
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(post.image_status, ImageStatus.READY)
+        self.assertIn('1', out.getvalue())
+
+
+class SeedSocialGraphTests(APITestCase):
+    def seed(self, **options):
+        out = StringIO()
+        call_command(
+            'seed_social_graph', users=60, follows=8, posts=3, likes=5,
+            comments=2, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_graph_is_skewed_and_consistent(self):
+        self.assertIn('60 users', self.seed())
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Profile.objects.count(), 60)
+        self.assertFalse(Follower.objects.filter(
+            owner=models.F('followed')
+        ).exists())
+        # The denormalized counters match the rows
+        profiles = Profile.objects.order_by('-followers_count')
+        self.assertEqual(
+            sum(profile.followers_count for profile in profiles),
+            Follower.objects.count(),
+        )
+        for post in Post.objects.all()[:20]:
+            self.assertEqual(post.likes_count, post.likes.count())
+            self.assertEqual(post.comments_count, post.comment_set.count())
+        # Heavy tailed: the top tenth of users draw over twice their share
+        top = sum(profile.followers_count for profile in profiles[:6])
+        self.assertGreater(top, Follower.objects.count() / 5)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(self.client.login(username='user0', password='pass'))
+        response = self.client.get('/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_same_seed_same_graph(self):
+        self.seed(prefix='a')
+        self.seed(prefix='b')
+
+        def follows(prefix):
+            return sorted(Follower.objects.filter(
+                owner__username__startswith=prefix
+            ).values_list('owner__username', 'followed__username'))
+        self.assertEqual(
+            [(o[1:], f[1:]) for o, f in follows('a')],
+            [(o[1:], f[1:]) for o, f in follows('b')],
+        )
+
+    def test_existing_prefix_is_refused(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
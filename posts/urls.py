@@ -4,6 +4,8 @@ from posts import views
 urlpatterns = [
   path('posts/', views.PostList.as_view()),
     path('posts/<int:pk>/', views.PostDetail.as_view()),
+    path('posts/<int:pk>/page/', views.PostPage.as_view()),
     path('category/', views.CategoryView.as_view()),
+    path('category/<str:category>/', views.CategoryView.as_view()),
 
 ]
\ No newline at end of file
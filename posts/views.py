@@ -1,13 +1,29 @@
 # Import necessary modules and classes from Django REST framework and custom permissions
-from django.db.models import Count
 from rest_framework import generics, permissions, filters
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_api.cache import AnonymousResponseCacheMixin
+from drf_api.conditional import ConditionalDetailMixin, ConditionalListMixin
+from drf_api.mixins import SelectRelatedMixin
+from drf_api.pagination import FeedPagination, KeysetPagination
 from drf_api.permissions import IsOwnerOrReadOnly
-from .models import Post
-from .serializers import PostSerializer
+from drf_api.values import FastListMixin
+from comments.models import Comment
+from comments.serializers import CommentThreadSerializer
+from profiles.serializers import ProfileSerializer
+from .models import Categories, Post
+from .search import PostSearchFilter
+from .serializers import PostExcerptSerializer, PostSerializer
 
 
-class CategoryView(generics.ListCreateAPIView):
+class CategoryView(FastListMixin, ConditionalListMixin, AnonymousResponseCacheMixin, SelectRelatedMixin, generics.ListAPIView):
+    """
+    List the posts in one category, newest first, with keyset pagination.
+    Pages served to logged out users come from the response cache until
+    a post, comment, like, follow or profile is written.
+    """
     # Use PostSerializer to serialize the data
     serializer_class = PostSerializer
 
@@ -17,48 +33,61 @@ class CategoryView(generics.ListCreateAPIView):
 
     # Define the initial queryset for the list view,
     # which is all Post objects sorted by creation time
-    queryset = Post.objects.all()
+    queryset = Post.objects.order_by('-created_at')
+    pagination_class = KeysetPagination
+    cache_tags = ('posts',)
+    etag_fields = ('likes_count', 'comments_count', 'like_id')
+    etag_annotations = {'profile_updated_at': 'owner__profile__updated_at'}
+
+    def get_category(self):
+        # Categories are stored lower case, so an exact match can use the
+        # (category, created_at) index instead of a case-insensitive scan
+        category = self.kwargs.get('category')
+        if category is None:
+            return None
+        category = category.lower()
+        if category not in Categories.values:
+            raise NotFound(f'Unknown category: {category}')
+        return category
+
+    def get_queryset(self):
+        queryset = super().get_queryset().page_keys_only()
+        if self.wants('like_id'):
+            queryset = queryset.with_like_id(self.request.user)
+        category = self.get_category()
+        if category is not None:
+            queryset = queryset.filter(category=category)
+        return queryset
 
     def post(self, request, format=None):
-        # Extract data from the request
-        data = self.request.data
-
-        # Retrieve the 'category' from the request data
-        category = data['category']
-
-        # Filter the posts by the specified category in a case-insensitive manner,
-        # and order them by the time of creation in descending order
-        queryset = Post.objects.order_by('-created_at').filter(category__iexact=category)
-
-        # Serialize the queryset with PostSerializer, indicating that
-        # the queryset contains multiple items
-        serializer = PostSerializer(queryset, many=True)
-
-        # Return the serialized data in the response
-        return Response(serializer.data)
+        # Kept for clients that still POST {'category': ...}; returns the
+        # first page of the category like a GET would
+        self.kwargs['category'] = request.data.get('category', '')
+        return self.list(request)
 
 # PostList class for handling the listing and creation of posts
-class PostList(generics.ListCreateAPIView):
+class PostList(FastListMixin, ConditionalListMixin, AnonymousResponseCacheMixin, SelectRelatedMixin, generics.ListCreateAPIView):
     """
     List posts or create a post if logged in.
     The perform_create method associates the post with the logged in user.
+    With ?excerpts=true the list leaves out content, showing only the
+    stored excerpt, and content isn't read from the database.
     """
     serializer_class = PostSerializer  # Specifies the serializer to use for formatting request/response data
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # Permissions - allow any read actions but restrict write actions to authenticated users
+    pagination_class = FeedPagination  # Page numbers by default, keyset with ?pagination=keyset
+    cache_tags = ('posts',)  # Cached responses for logged out users are dropped on any write to these tags
+    etag_fields = ('likes_count', 'comments_count', 'like_id')  # Besides id and updated_at, what the page's weak ETag covers
+    etag_annotations = {'profile_updated_at': 'owner__profile__updated_at'}  # Profile names and images show on each item
 
-    # Using Django's annotate to add additional fields to the queryset.
-    # These annotations are used to count related objects.
-    queryset = Post.objects.annotate(
-    # Counting the number of likes related to the object, ensuring each like is counted only once.
-    likes_count=Count('likes', distinct=True),
-    # Counting the number of comments related to the object, also ensuring distinct counting.
-    comments_count=Count('comment', distinct=True)
-    ).order_by('-created_at')  # Ordering the results by the creation date of the main object, newest first.
+    # likes_count and comments_count are stored on Post and kept up to date
+    # by signals, so no aggregate joins are needed here.
+    queryset = Post.objects.order_by('-created_at')  # Ordering the results by the creation date of the main object, newest first.
 
     # Setting up filter backends to allow dynamic ordering of the queryset in the API.
     filter_backends = [
         filters.OrderingFilter,  # Using Django REST framework's OrderingFilter.
-        filters.SearchFilter,   # Using Django REST framework's SearchFilter.
+        PostSearchFilter,       # Full-text ?search= over title, content and owner username.
         DjangoFilterBackend,
     ]
 
@@ -68,6 +97,8 @@ class PostList(generics.ListCreateAPIView):
         'owner__profile',
     ]
 
+    # Only used by the SearchFilter fallback on databases without full-text
+    # support in posts.search
     search_fields = [
         'owner__username',
         'title',
@@ -80,6 +111,28 @@ class PostList(generics.ListCreateAPIView):
     'likes__created_at',    # Allowing ordering by the creation date of likes.
     ]
 
+    def excerpts_only(self):
+        return (
+            self.request.method == 'GET'
+            and self.request.query_params.get('excerpts', '').lower() == 'true'
+        )
+
+    def get_serializer_class(self):
+        if self.excerpts_only():
+            return PostExcerptSerializer
+        return PostSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.wants('like_id'):
+            # Resolve the requesting user's likes for the whole page in one
+            # query; left out when ?fields=/?omit= drop like_id
+            queryset = queryset.with_like_id(self.request.user)
+        if self.request.method == 'GET':
+            # Post bodies come from PostListSerializer's cache
+            queryset = queryset.page_keys_only()
+        return queryset
+
     def perform_create(self, serializer):
         """
         Custom method to associate the current user with a new post during creation.
@@ -88,13 +141,95 @@ class PostList(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)  # Save the post instance with the owner field set to the currently authenticated user
 
 # PostDetail class for handling the retrieval, update, and deletion of a specific post
-class PostDetail(generics.RetrieveUpdateDestroyAPIView):
+class PostDetail(ConditionalDetailMixin, AnonymousResponseCacheMixin, SelectRelatedMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve a post and edit or delete it if you own it.
     """
     serializer_class = PostSerializer  # Specifies the serializer for post data
     permission_classes = [IsOwnerOrReadOnly]  # Custom permission - allows operations only if the user is the owner of the post
-    queryset = Post.objects.annotate(
-        likes_count=Count('likes', distinct=True),
-        comments_count=Count('comment', distinct=True)
-    ).order_by('-created_at')
\ No newline at end of file
+    queryset = Post.objects.order_by('-created_at')
+
+    def get_queryset(self):
+        return super().get_queryset().with_like_id(self.request.user)
+
+    # Everything a post's representation depends on, read by the cheap
+    # pre-query that answers conditional GETs
+    validator_fields = (
+        'updated_at', 'likes_count', 'comments_count', 'like_id',
+        'owner__profile__updated_at',
+    )
+
+    def get_validator_queryset(self):
+        return super().get_validator_queryset().with_like_id(self.request.user)
+
+    def get_cache_tags(self):
+        return [f'post:{self.object.pk}', f'user:{self.object.owner_id}']
+
+
+
+# PostPage class for reading everything the post page shows in one request
+class PostPage(AnonymousResponseCacheMixin, generics.RetrieveAPIView):
+    """
+    Retrieve a post, its owner's profile and the first page of its comment
+    thread together. The viewer's like is the post's like_id and their
+    follow of the owner the profile's following_id. Takes two queries:
+    one for the post with its owner, profile and the viewer's like and
+    follow, and one for the comments. ?fields= and ?omit= don't apply, as
+    the sections have different fields.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    queryset = Post.objects.select_related('owner__profile')
+    comments_pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        return super().get_queryset().with_like_id(
+            user
+        ).with_author_following_id(user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = False
+        return context
+
+    def get_cache_tags(self):
+        # Comments, likes and follows of the owner bump these too, and the
+        # commenters' tags cover their names and images on the thread
+        owners = {self.object.owner_id, *self.commenter_ids}
+        return [f'post:{self.object.pk}', *(f'user:{pk}' for pk in owners)]
+
+    def get_comments(self, post):
+        # The first page of /posts/<id>/comments/, linking to the next one
+        pagination = self.comments_pagination_class()
+        comments = list(
+            Comment.objects.filter(post=post)
+            .select_related('owner__profile')
+            .order_by(*pagination.ordering)[:pagination.page_size + 1]
+        )
+        next_link = None
+        if len(comments) > pagination.page_size:
+            comments = comments[:pagination.page_size]
+            next_link = replace_query_param(
+                self.request.build_absolute_uri(f'/posts/{post.pk}/comments/'),
+                pagination.cursor_query_param,
+                pagination.encode_cursor(comments[-1]),
+            )
+        self.commenter_ids = {comment.owner_id for comment in comments}
+        return {
+            'next': next_link,
+            'results': CommentThreadSerializer(
+                comments, many=True, context=self.get_serializer_context()
+            ).data,
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_object()
+        profile = post.owner.profile
+        profile.following_id = post.author_following_id
+        context = self.get_serializer_context()
+        return Response({
+            'post': PostSerializer(post, context=context).data,
+            'profile': ProfileSerializer(profile, context=context).data,
+            'comments': self.get_comments(post),
+        })
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from drf_api.cache import bump_tags
+from followers.models import Follower
+from posts.models import Post
+from profiles.models import Profile
+
+
+def count_of(model, field):
+    # Correlated subquery counting the rows of model whose field points at
+    # the profile's owner
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('owner')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), Value(0))
+
+
+class Command(BaseCommand):
+    """
+    Recompute the posts, followers and following counters on every profile
+    and repair any profile whose stored counters have drifted.
+    """
+    help = 'Recompute the denormalized post and follow counters on profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted profiles without repairing them.',
+        )
+
+    def handle(self, *args, **options):
+        counters = {
+            'posts_count': lambda: count_of(Post, 'owner'),
+            'followers_count': lambda: count_of(Follower, 'followed'),
+            'following_count': lambda: count_of(Follower, 'owner'),
+        }
+        with transaction.atomic():
+            drift = Q()
+            for field in counters:
+                drift |= ~Q(**{field: F(f'actual_{field}')})
+            drifted = list(Profile.objects.annotate(**{
+                f'actual_{field}': count() for field, count in counters.items()
+            }).filter(drift).values_list('pk', flat=True))
+
+            if drifted and not options['dry_run']:
+                Profile.objects.filter(pk__in=drifted).update(**{
+                    field: count() for field, count in counters.items()
+                })
+                bump_tags('profiles', *(
+                    f'user:{owner}' for owner in Profile.objects.filter(
+                        pk__in=drifted
+                    ).values_list('owner_id', flat=True)
+                ))
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb} {len(drifted)} drifted profile(s).')
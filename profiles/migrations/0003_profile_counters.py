@@ -0,0 +1,63 @@
+# Generated by Django 3.2.23 on 2026-10-18 16:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Profile = apps.get_model('profiles', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+    Follower = apps.get_model('followers', 'Follower')
+
+    def count_of(model, field):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('owner')}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total')
+        ), Value(0))
+
+    Profile.objects.update(
+        posts_count=count_of(Post, 'owner'),
+        followers_count=count_of(Follower, 'followed'),
+        following_count=count_of(Follower, 'owner'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_alter_profile_image'),
+        ('posts', '0004_post_counters'),
+        ('followers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['posts_count'], name='profile_posts_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['followers_count'], name='profile_followers_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['following_count'], name='profile_following_count_idx'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
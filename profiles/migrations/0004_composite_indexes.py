@@ -0,0 +1,17 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_profile_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-created_at'], name='profile_created_idx'),
+        ),
+    ]
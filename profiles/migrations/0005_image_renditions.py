@@ -0,0 +1,28 @@
+# Generated by Django 3.2.23 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_renditions',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='staged_image',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -1,6 +1,30 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from drf_api.cache import bump_tags
+from drf_api.images import ImageStatus, discard_staged_image
+from followers.models import Follower, follows_created, follows_deleted
+from posts.models import Post
+
+
+class ProfileQuerySet(models.QuerySet):
+    """
+    QuerySet helpers shared by the profile views.
+    """
+
+    def with_following_id(self, user):
+        # Annotates each profile with the id of the requesting user's follow
+        # of its owner, so a whole page resolves following_id in one query.
+        if not user.is_authenticated:
+            return self.annotate(following_id=models.Value(
+                None, output_field=models.BigIntegerField()
+            ))
+        return self.annotate(following_id=models.Subquery(
+            Follower.objects.filter(
+                owner=user, followed=models.OuterRef('owner')
+            ).values('id')[:1]
+        ))
 
 
 # Define your Profile model
@@ -22,14 +46,56 @@ class Profile(models.Model):
     image = models.ImageField(
         upload_to='images/', default='../default_profile_fvwztb_vlnjbh'
     )
+    # New uploads go through the image pipeline as they do for posts
+    image_status = models.CharField(
+        max_length=16, choices=ImageStatus.choices,
+        default=ImageStatus.READY, editable=False,
+    )
+    staged_image = models.CharField(max_length=255, blank=True, editable=False)
+    image_renditions = models.JSONField(default=dict, editable=False)
+
+    # Denormalized counters, kept in step by the Post and Follower signal
+    # handlers below and repaired with the recount_profiles command
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProfileQuerySet.as_manager()
 
     class Meta:
         # Define the default ordering for profiles based on creation date
         ordering = ['-created_at']
+        indexes = [
+            # Serves the default newest first ordering of ProfileList
+            models.Index(fields=['-created_at'], name='profile_created_idx'),
+            # Back the counter ordering options of ProfileList
+            models.Index(
+                fields=['posts_count'], name='profile_posts_count_idx'
+            ),
+            models.Index(
+                fields=['followers_count'], name='profile_followers_count_idx'
+            ),
+            models.Index(
+                fields=['following_count'], name='profile_following_count_idx'
+            ),
+        ]
 
     def __str__(self):
         # Define how the profile should be represented as a string
         return f"{self.owner}'s profile"
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # The counters are only changed by UPDATEs relative to the stored
+        # value, so saving an existing profile doesn't write back the ones
+        # it was loaded with
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (
+                    'posts_count', 'followers_count', 'following_count'
+                )
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
     
 # Define a function to create a profile when a new user is created
 def create_profile(sender, instance, created, **kwargs):
@@ -39,3 +105,75 @@ def create_profile(sender, instance, created, **kwargs):
 
 # Connect the create_Profile function to the post_save signal of the User model
 post_save.connect(create_profile, sender=User)
+
+
+# Keep the Profile counters in step with the posts and followers tables.
+# Each update is an atomic F() expression; follow changes touch two
+# profiles, so those updates share a transaction.
+def adjust_counter(user_id, field, delta):
+    profiles = Profile.objects.filter(owner_id=user_id)
+    if delta < 0:
+        profiles = profiles.filter(**{f'{field}__gt': 0})
+    profiles.update(**{field: models.F(field) + delta})
+
+
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.owner_id, 'posts_count', 1)
+
+
+def decrement_posts_count(sender, instance, **kwargs):
+    adjust_counter(instance.owner_id, 'posts_count', -1)
+
+
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        with transaction.atomic():
+            adjust_counter(instance.owner_id, 'following_count', 1)
+            adjust_counter(instance.followed_id, 'followers_count', 1)
+
+
+def decrement_follow_counts(sender, instance, **kwargs):
+    with transaction.atomic():
+        adjust_counter(instance.owner_id, 'following_count', -1)
+        adjust_counter(instance.followed_id, 'followers_count', -1)
+
+
+def follows_of(field):
+    # Correlated subquery counting the follows whose field is a profile's
+    # owner
+    return Coalesce(models.Subquery(
+        Follower.objects.filter(**{field: models.OuterRef('owner')})
+        .order_by().values(field).annotate(total=models.Count('pk'))
+        .values('total')
+    ), models.Value(0))
+
+
+def recount_follow_counts(sender, owner_id, followed_ids, **kwargs):
+    # Bulk follows and unfollows recount the touched profiles from the
+    # followers table rather than adjusting each one
+    with transaction.atomic():
+        Profile.objects.filter(owner_id=owner_id).update(
+            following_count=follows_of('owner')
+        )
+        Profile.objects.filter(owner_id__in=followed_ids).update(
+            followers_count=follows_of('followed')
+        )
+
+
+post_save.connect(increment_posts_count, sender=Post)
+post_delete.connect(decrement_posts_count, sender=Post)
+post_save.connect(increment_follow_counts, sender=Follower)
+post_delete.connect(decrement_follow_counts, sender=Follower)
+follows_created.connect(recount_follow_counts, sender=Follower)
+follows_deleted.connect(recount_follow_counts, sender=Follower)
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # Profile images are shown on posts as well as on profiles
+    bump_tags('posts', 'profiles', f'user:{instance.owner_id}')
+
+
+post_save.connect(invalidate_cached_responses, sender=Profile)
+post_delete.connect(invalidate_cached_responses, sender=Profile)
+post_delete.connect(discard_staged_image, sender=Profile)
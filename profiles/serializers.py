@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from drf_api.fields import SparseFieldsMixin
+from drf_api.images import ImagePipelineSerializerMixin
+from drf_api.values import ValuesSerializer
 from .models import Profile
 from followers.models import Follower
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(SparseFieldsMixin, ImagePipelineSerializerMixin, serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     is_owner = serializers.SerializerMethodField()
     following_id = serializers.SerializerMethodField()
@@ -13,11 +16,14 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 
     def get_is_owner(self, obj):
-        request = self.context['request']
-        return request.user == obj.owner
+        # Compares ids, so the owner row isn't needed
+        return self.context['request'].user.pk == obj.owner_id
 
     def get_following_id(self, obj):
         user = self.context['request'].user
+        if hasattr(obj, 'following_id'):
+            # Annotated for the whole page by Profile.objects.with_following_id
+            return obj.following_id
         if user.is_authenticated:
             following = Follower.objects.filter(
                 owner=user, followed=obj.owner
@@ -30,6 +36,49 @@ class ProfileSerializer(serializers.ModelSerializer):
         model = Profile
         fields = [
             'id', 'owner', 'created_at', 'updated_at', 'name',
-            'content', 'image', 'is_owner', 'following_id',
+            'content', 'image', 'image_status', 'image_renditions',
+            'is_owner', 'following_id',
             'posts_count', 'followers_count', 'following_count',
-        ]
\ No newline at end of file
+        ]
+
+
+class ProfileValuesSerializer(ValuesSerializer):
+    """
+    Read-only ProfileSerializer for .values() rows of a queryset annotated
+    by with_following_id, with the same output
+    """
+    columns = (
+        'id', 'owner_id', 'owner__username', 'created_at', 'updated_at',
+        'name', 'content', 'image', 'image_status', 'image_renditions',
+        'following_id', 'posts_count',
+        'followers_count', 'following_count',
+    )
+    field_columns = {
+        'owner': ('owner__username',),
+        'content': ('content',),
+        'image': ('image',),
+        'image_renditions': ('image', 'image_renditions'),
+        # Annotated by the view only when the field is kept
+        'following_id': ('following_id',),
+    }
+    image_field = Profile._meta.get_field('image')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'owner': row['owner__username'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+            'name': row['name'],
+            'content': row['content'],
+            'image': self.image(self.image_field, row['image']),
+            'image_status': row['image_status'],
+            'image_renditions': self.renditions(
+                self.image_field, row['image'], row['image_renditions'],
+            ),
+            'is_owner': self.is_owner(row['owner_id']),
+            'following_id': row['following_id'],
+            'posts_count': row['posts_count'],
+            'followers_count': row['followers_count'],
+            'following_count': row['following_count'],
+        }
@@ -1,3 +1,189 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from followers.models import Follower
+from posts.models import Post
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import Profile
+from .views import ProfileList
 
-# Create your tests here.
+
+class ProfileFollowingIdTests(APITestCase):
+    def setUp(self):
+        # Adam follows brian but not carl.
+        adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+        User.objects.create_user(username='carl', password='pass')
+        self.follow = Follower.objects.create(owner=adam, followed=self.brian)
+
+    def follower_queries(self):
+        # Counts the queries of one profile list page that touch the
+        # followers table outside of the count annotations
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/profiles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([
+            query for query in context.captured_queries
+            if 'followers_follower' in query['sql']
+        ])
+
+    def test_following_id_matches_the_users_follow(self):
+        self.client.login(username='adam', password='pass')
+        response = self.client.get('/profiles/')
+        following_ids = {
+            profile['owner']: profile['following_id']
+            for profile in response.data['results']
+        }
+        self.assertEqual(following_ids, {
+            'adam': None, 'brian': self.follow.id, 'carl': None,
+        })
+
+    def test_following_id_is_none_when_logged_out(self):
+        response = self.client.get(f'/profiles/{self.brian.profile.id}/')
+        self.assertIsNone(response.data['following_id'])
+
+    def test_follow_lookups_do_not_grow_with_page_size(self):
+        # Regression test for the per-profile Follower query
+        self.client.login(username='adam', password='pass')
+        three_profiles = self.follower_queries()
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', password='pass')
+        self.assertEqual(self.follower_queries(), three_profiles)
+
+
+class ProfileCounterTests(APITestCase):
+    def setUp(self):
+        self.adam = User.objects.create_user(username='adam', password='pass')
+        self.brian = User.objects.create_user(username='brian', password='pass')
+
+    def test_counters_follow_posts_and_follows(self):
+        post = Post.objects.create(owner=self.adam, title='a title')
+        follow = Follower.objects.create(owner=self.brian, followed=self.adam)
+        adam, brian = self.adam.profile, self.brian.profile
+        adam.refresh_from_db()
+        brian.refresh_from_db()
+        self.assertEqual(adam.posts_count, 1)
+        self.assertEqual(adam.followers_count, 1)
+        self.assertEqual(brian.following_count, 1)
+
+        post.delete()
+        follow.delete()
+        adam.refresh_from_db()
+        brian.refresh_from_db()
+        self.assertEqual(adam.posts_count, 0)
+        self.assertEqual(adam.followers_count, 0)
+        self.assertEqual(brian.following_count, 0)
+
+    def test_saving_a_stale_profile_keeps_its_counters(self):
+        stale = Profile.objects.get(owner=self.adam)
+        Post.objects.create(owner=self.adam, title='a title')
+        Follower.objects.create(owner=self.brian, followed=self.adam)
+        stale.name = 'Adam'
+        stale.save()
+        profile = Profile.objects.get(owner=self.adam)
+        self.assertEqual(profile.name, 'Adam')
+        self.assertEqual(profile.posts_count, 1)
+        self.assertEqual(profile.followers_count, 1)
+
+    def test_can_order_profiles_by_followers_count(self):
+        Follower.objects.create(owner=self.adam, followed=self.brian)
+        response = self.client.get('/profiles/?ordering=-followers_count')
+        owners = [profile['owner'] for profile in response.data['results']]
+        self.assertEqual(owners, ['brian', 'adam'])
+        self.assertEqual(response.data['results'][0]['followers_count'], 1)
+
+    def test_recount_profiles_repairs_drift(self):
+        Post.objects.create(owner=self.adam, title='a title')
+        Profile.objects.filter(owner=self.adam).update(
+            posts_count=5, followers_count=2
+        )
+        out = StringIO()
+        call_command('recount_profiles', stdout=out)
+        profile = Profile.objects.get(owner=self.adam)
+        self.assertEqual(profile.posts_count, 1)
+        self.assertEqual(profile.followers_count, 0)
+        self.assertIn('Repaired 1 drifted profile(s).', out.getvalue())
+
+
+class ProfileQueryCountTests(APITestCase):
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/profiles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        User.objects.create_user(username='adam', password='pass')
+        one_profile = self.count_queries()
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', password='pass')
+        self.assertEqual(self.count_queries(), one_profile)
+
+
+@override_settings(RESPONSE_CACHE=True)
+class ProfileResponseCacheTests(APITestCase):
+    def test_follows_invalidate_cached_profiles(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        url = f'/profiles/{brian.profile.id}/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        Follower.objects.create(owner=adam, followed=brian)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['followers_count'], 1)
+
+
+
+class ProfileValuesSerializerTests(APITestCase):
+    def test_profile_list_output_is_unchanged(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        Follower.objects.create(owner=adam, followed=brian)
+        Post.objects.create(owner=brian, title='a title')
+        brian.profile.name = 'Bri\u00e1n'
+        brian.profile.save()
+        self.client.force_authenticate(adam)
+
+        fast = self.client.get('/profiles/?ordering=-followers_count')
+        with mock.patch.multiple(
+            ProfileList, fast_json=False, values_serializer_class=None
+        ):
+            slow = self.client.get('/profiles/?ordering=-followers_count')
+        self.assertEqual(fast.content, slow.content)
+        self.assertIsNotNone(fast.data['results'][0]['following_id'])
+
+
+class ProfileSparseFieldsTests(APITestCase):
+    def setUp(self):
+        adam = User.objects.create_user(username='adam', password='pass')
+        brian = User.objects.create_user(username='brian', password='pass')
+        Follower.objects.create(owner=adam, followed=brian)
+        self.client.force_authenticate(adam)
+
+    def test_omitted_fields_are_left_out_of_the_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/profiles/?fields=id,name,posts_count')
+        self.assertEqual(
+            list(response.data['results'][0]), ['id', 'name', 'posts_count']
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('followers_follower', sql)
+        self.assertNotIn('auth_user', sql)
+
+    def test_output_matches_the_model_serializer(self):
+        url = '/profiles/?omit=content,image'
+        fast = self.client.get(url)
+        with mock.patch.multiple(
+            ProfileList, fast_json=False, values_serializer_class=None
+        ):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
+        self.assertNotIn('image', fast.data['results'][0])
+        self.assertIsNotNone(fast.data['results'][0]['following_id'])
@@ -1,26 +1,30 @@
 # Importing necessary Django and Django REST framework classes
-from django.db.models import Count
 from rest_framework import generics, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_api.cache import AnonymousResponseCacheMixin
+from drf_api.conditional import ConditionalDetailMixin, ConditionalListMixin
+from drf_api.mixins import SelectRelatedMixin
 from drf_api.permissions import IsOwnerOrReadOnly
+from drf_api.values import FastListMixin
 from .models import Profile
-from .serializers import ProfileSerializer
+from .serializers import ProfileSerializer, ProfileValuesSerializer
 
 # ProfileList class for handling the listing of profiles
-class ProfileList(generics.ListAPIView):
+class ProfileList(FastListMixin, ConditionalListMixin, AnonymousResponseCacheMixin, SelectRelatedMixin, generics.ListAPIView):
     """
     List all profiles.
     No create view as profile creation is handled by Django signals.
     """
-    # Annotating the queryset to include counts of posts, followers, and following for each profile.
-    # Using 'distinct=True' to avoid duplicate counts in case of multiple related objects.
-    queryset = Profile.objects.annotate(
-        posts_count=Count('owner__post', distinct=True),
-        followers_count=Count('owner__followed', distinct=True),
-        following_count=Count('owner__following', distinct=True)
-    ).order_by('-created_at')  # Ordering profiles by creation date, newest first.
+    # posts_count, followers_count and following_count are stored on Profile
+    # and kept up to date by signals, so no aggregate joins are needed here.
+    queryset = Profile.objects.order_by('-created_at')  # Ordering profiles by creation date, newest first.
 
     serializer_class = ProfileSerializer  # Specifying the serializer class for the Profile model.
+    values_serializer_class = ProfileValuesSerializer  # Lists are built from .values() rows with the same output
+    cache_tags = ('profiles',)  # Cached responses for logged out users are dropped on any write to these tags
+    etag_fields = (  # Besides id and updated_at, what the page's weak ETag covers
+        'posts_count', 'followers_count', 'following_count', 'following_id',
+    )
 
     # Configuring filter backends to allow ordering of the results.
     filter_backends = [
@@ -41,16 +45,39 @@ class ProfileList(generics.ListAPIView):
         'owner__followed__created_at',
     ]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.wants('following_id'):
+            # Resolve the requesting user's follows for the whole page in one
+            # query; left out when ?fields=/?omit= drop following_id
+            queryset = queryset.with_following_id(self.request.user)
+        return queryset
+
 # ProfileDetail class for handling the retrieval and update of a specific profile
-class ProfileDetail(generics.RetrieveUpdateAPIView):
+class ProfileDetail(ConditionalDetailMixin, AnonymousResponseCacheMixin, SelectRelatedMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve or update a profile if you're the owner.
     """
     permission_classes = [IsOwnerOrReadOnly]  # Custom permission - allows operations only if the user is the owner of the profile.
-    # Using the same annotated queryset as in ProfileList to include counts in the detailed view.
-    queryset = Profile.objects.annotate(
-        posts_count=Count('owner__post', distinct=True),
-        followers_count=Count('owner__followed', distinct=True),
-        following_count=Count('owner__following', distinct=True)
-    ).order_by('-created_at')
+    # Using the same queryset as in ProfileList; the counts are stored columns.
+    queryset = Profile.objects.order_by('-created_at')
     serializer_class =  ProfileSerializer  # Specifying the serializer class for the Profile model.
+
+    def get_queryset(self):
+        return super().get_queryset().with_following_id(self.request.user)
+
+    # Everything a profile's representation depends on, read by the cheap
+    # pre-query that answers conditional GETs
+    validator_fields = (
+        'updated_at', 'posts_count', 'followers_count', 'following_count',
+        'following_id',
+    )
+
+    def get_validator_queryset(self):
+        return super().get_validator_queryset().with_following_id(
+            self.request.user
+        )
+
+    def get_cache_tags(self):
+        return [f'user:{self.object.owner_id}']
+